@@ -2,33 +2,62 @@
 from __future__ import annotations
 
 import contextlib
+import dataclasses
+import datetime
+import heapq
+import importlib
 import logging
 import os
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from functools import wraps
+from typing import TYPE_CHECKING, TypeVar
 from urllib.parse import urlparse
 
 import click
 from click_help_colors import HelpColorsGroup
-from requests.exceptions import HTTPError
-from rich import box
-from rich.markdown import Markdown
-from rich.table import Table
-from yaml import YAMLError, dump, safe_load
-
-from gri.abc import Query, Review, Server
-from gri.console import TERMINAL_THEME, bootstrap, get_logging_level
+
+from gri import spans
+from gri.abc import TABLE_FIELDS, Query, Review, Server, utcnow
+from gri.console import TERMINAL_THEME, LazyConsole, get_logging_level
 from gri.constants import RC_CONFIG_ERROR, RC_PARTIAL_RUN
-from gri.gerrit import GerritServer
-from gri.github import GithubServer
+from gri.index import SYNC_OVERLAP, ReviewIndex
+from gri.score import ScoreRank
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from concurrent.futures import Future
+
+    from rich.table import Table
+
+    from gri.export import Exporter
+
+# Modules needed only to query servers or to render reports, like requests,
+# rich or yaml, are imported when used, keeping --help and completion fast.
+term = LazyConsole()
 
-term = bootstrap()
+# Server classes of each backend, imported only when a server uses them
+BACKENDS = {
+    "gerrit": ("gri.gerrit", "GerritServer"),
+    "github": ("gri.github", "GithubServer"),
+    "github-graphql": ("gri.github", "GithubGraphQLServer"),
+}
 
 # Respect XDG_CONFIG_HOME
 CFG_FILE = "~/.config/gri/gri.yaml"
 GERTTY_CFG_FILE = "~/.gertty.yaml"
+# Rows printed at once by --stream
+STREAM_BATCH = 100
+# Seconds between checks of server deadlines, as those of queries waiting for
+# a worker are only known once they start
+DEADLINE_POLL = 1.0
+# Widths of columns of streamed tables, subject and meta sharing what remains
+# using these ratios
+FIXED_WIDTHS = {"review": 10, "age": 4, "score": 5, "subject": 4, "meta": 1}
 
 LOG = logging.getLogger(__package__)
+T = TypeVar("T")
 
 
 def command_line_wrapper(func):
@@ -36,12 +65,13 @@ def command_line_wrapper(func):
     def inner_func(*args, **kwargs):
         # before
         ctx = args[0]
+        # output is recorded only when it has to be saved as HTML
+        term.get(
+            record=bool(ctx.params["output"]) and ctx.params["format"] == "table",
+        )  # also sets up logging
         LOG.setLevel(get_logging_level(ctx))
         LOG.debug("Called with %s", ctx.params)
 
-        if " " in ctx.params["user"]:
-            ctx.params["user"] = f"\"{ctx.params['user']}\""
-
         # inner/wrapped code
         func(*args, **kwargs)
         # after
@@ -51,13 +81,6 @@ def command_line_wrapper(func):
             )
             ctx.invoke(owned)
 
-        if ctx.params["output"]:
-            term.save_html(path=ctx.params["output"], theme=TERMINAL_THEME)
-
-        if ctx.obj.errors:
-            LOG.error("Finished with %s runtime errors", ctx.obj.errors)
-            sys.exit(RC_PARTIAL_RUN)
-
     return inner_func
 
 
@@ -76,13 +99,33 @@ class Config(dict):
                 GERTTY_CFG_FILE,
             )
             config_file_full = config_file_full = os.path.expanduser(GERTTY_CFG_FILE)
+        # pylint: disable=import-outside-toplevel
+        from yaml import YAMLError, load
+
+        try:
+            from yaml import CSafeLoader as SafeLoader
+        except ImportError:  # libyaml is not available
+            from yaml import SafeLoader  # type: ignore[assignment]
+
         try:
             with open(config_file_full, encoding="utf-8") as stream:
-                return dict(safe_load(stream))
+                return dict(load(stream, Loader=SafeLoader))
         except (FileNotFoundError, YAMLError) as exc:
             LOG.error(exc)
             sys.exit(RC_CONFIG_ERROR)
 
+    def users(self, value: str) -> list[str]:
+        """Return users named by --user, a comma separated list of users and
+        of groups of them, defined by the groups key.
+        """
+        groups = self.get("groups", {})
+        users: list[str] = []
+        for name in filter(None, (n.strip() for n in value.split(","))):
+            for user in groups.get(name, [name]):
+                if user not in users:
+                    users.append(user)
+        return users
+
 
 # pylint: disable=too-few-public-methods,too-many-instance-attributes
 class App:
@@ -90,10 +133,29 @@ class App:
         self.kind = ""  # keep it until we make this abc
         self.ctx = ctx
         self.cfg = Config(file=ctx.params["config"])
+        if ctx.params["profile"] or ctx.params["profile_json"]:
+            spans.enable()
+        # functions forwarding spans, to a tracing system for instance
+        for hook in self.cfg.get("span-hooks", []):
+            module, _, name = hook.partition(":")
+            spans.add_hook(getattr(importlib.import_module(module), name))
         self.servers: list[Server] = []
         self.user = ctx.params["user"]
+        self.users = self.cfg.users(self.user)
         self.errors = 0  # number of errors encountered
         self.query_details: list[str] = []
+        # pylint: disable=import-outside-toplevel
+        from gri.cache import DEFAULT_MAX_SIZE, DEFAULT_TTL, HttpCache
+
+        self.cache = HttpCache(
+            ttl=self.cfg.get("cache-ttl", DEFAULT_TTL),
+            max_size=self.cfg.get("cache-size", DEFAULT_MAX_SIZE),
+            max_staleness=ctx.params["max_staleness"],
+            enabled=not ctx.params["no_cache"],
+        )
+        self.cache.evict()
+        self.index = self.open_index()
+        self.scorer = ScoreRank(self.cfg.get("score"))
         server = ctx.params["server"]
         try:
             for srv in (
@@ -103,11 +165,20 @@ class App:
             ):
                 try:
                     parsed_uri = urlparse(srv["url"])
-                    srv_class: type[GithubServer | GerritServer] = GerritServer
+                    backend = "gerrit"
                     if parsed_uri.netloc == "github.com":
-                        srv_class = GithubServer
+                        backend = "github"
+                        if srv.get("api") == "graphql":
+                            backend = "github-graphql"
+                    module, class_name = BACKENDS[backend]
+                    srv_class = getattr(importlib.import_module(module), class_name)
                     self.servers.append(
-                        srv_class(url=srv["url"], name=srv["name"], ctx=self.ctx),
+                        srv_class(
+                            url=srv["url"],
+                            name=srv["name"],
+                            ctx=self.ctx,
+                            cfg=srv,
+                        ),
                     )
                 except SystemError as exc:  # noqa: PERF203
                     LOG.error(exc)
@@ -119,75 +190,519 @@ class App:
             sys.exit(RC_CONFIG_ERROR)
 
         self.reviews: list[Review] = []
-        term.print(self.header())
+        # calls to servers given up on, still running in worker threads
+        self.overdue = 0
+        # servers given up on, not queried again until next watch refresh
+        self.late: set[Server] = set()
+        # reference time of ages and scores, taken again by each run_query()
+        self.now = utcnow()
+        # reports requested by chained commands, produced together by flush()
+        self.pending: list[dict] = []
+        # results of queries already made by this invocation
+        self.results: dict[tuple[Server, str], list[Review]] = {}
+        # seconds between refreshes of reports, set by watch command
+        self.interval = 0.0
+        # writes reviews of reports when --format is not table
+        self.exporter: Exporter | None = None
+        if ctx.params["format"] != "table":
+            from gri.export import open_exporter
+
+            self.exporter = open_exporter(ctx.params["format"], ctx.params["output"])
+            # keep standard output for exported reviews
+            LOG.info(self.header())
+        else:
+            term.print(self.header())
 
     def run_query(self, query: Query, kind: str) -> int:
-        """Performs a query and stores result inside reviews attribute."""
+        """Performs a query and stores result inside reviews attribute.
+
+        Servers are queried concurrently, using at most ``--jobs`` workers, and
+        their results are merged as soon as each of them answers. Servers still
+        answering once their timeout elapsed since their query started, or
+        given up on by a previous query, are counted as errors.
+        """
+        # pylint: disable=import-outside-toplevel
+        from requests.exceptions import RequestException
+
         errors = 0
         self.reviews.clear()
-        self.query_details = []
+        self.now = utcnow()
+        details: dict[Server, list[str]] = {}
         for server in self.servers:
+            if server in self.late:
+                LOG.error("%s: skipped, as it did not answer in time", server.name)
+                errors += 1
+        for server, future in self.fan_out(
+            lambda server: self.query_server(server, query, kind),
+        ):
+            if future is None:
+                LOG.error("%s: no complete answer in time", server.name)
+                errors += 1
+                continue
             try:
-                for review in server.query(query=query, kind=kind):
-                    self.reviews.append(review)
-                self.query_details.append(server.mk_query(query, kind=kind))
-            except (  # noqa: PERF203
-                HTTPError,
+                self.reviews.extend(future.result())
+                details[server] = server.split_query(query, kind=kind)
+            except (
+                RequestException,
                 RuntimeError,
                 NotImplementedError,
             ) as exc:
-                LOG.error(exc)
+                LOG.error("%s: %s", server.name, exc)
                 errors += 1
 
+        # keep details in configuration order, not in order of arrival
+        self.query_details = [
+            q for s in self.servers if s in details for q in details[s]
+        ]
         return errors
 
+    def fan_out(
+        self,
+        call: Callable[[Server], T],
+    ) -> Iterator[tuple[Server, Future[T] | None]]:
+        """Call a function with each server, using at most ``--jobs`` workers,
+        yielding servers with the future of their call as soon as it completes.
+
+        Servers still busy once their timeout elapsed since their call started
+        are yielded with None instead, left behind, and not called again.
+        """
+        servers = [server for server in self.servers if server not in self.late]
+        # when each server call started, set from worker threads
+        started: dict[Server, float] = {}
+
+        def run(server: Server) -> T:
+            started[server] = time.monotonic()
+            return call(server)
+
+        def deadline(server: Server) -> float:
+            """Return when server is given up on, once its call started."""
+            timeout = server.timeout[1] if server.timeout else None
+            if server not in started or not timeout:
+                return float("inf")
+            return started[server] + timeout
+
+        workers = max(1, min(self.ctx.params["jobs"], len(servers)))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gri")
+        try:
+            futures = {executor.submit(run, server): server for server in servers}
+            pending = set(futures)
+            while pending:
+                now = time.monotonic()
+                for future in [f for f in pending if deadline(futures[f]) <= now]:
+                    pending.discard(future)
+                    self.late.add(futures[future])
+                    self.overdue += 1
+                    yield futures[future], None
+                timeout = min(
+                    [deadline(futures[f]) - now for f in pending] + [DEADLINE_POLL],
+                )
+                done, pending = wait(
+                    pending,
+                    timeout=max(timeout, 0.0),
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    yield futures[future], future
+        finally:
+            # servers which missed their deadline are not waited for
+            executor.shutdown(wait=False)
+
+    def query_server(self, server: Server, query: Query, kind: str) -> list[Review]:
+        """Run a query against a single server, called from worker threads.
+
+        Results are kept for the whole invocation, as chained commands often
+        end up sending the same query.
+        """
+        server_query = server.mk_query(query, kind=kind)
+        key = (server, server_query)
+        if key not in self.results:
+            with spans.span("query", server=server.name, query=server_query) as span:
+                self.results[key] = self.fetch(server, query, kind, server_query)
+                span["items"] = len(self.results[key])
+            server.attribute(query, self.results[key])
+        return self.results[key]
+
+    def fetch(
+        self,
+        server: Server,
+        query: Query,
+        kind: str,
+        server_query: str,
+    ) -> list[Review]:
+        """Retrieve query results, recording them in the local index.
+
+        Index is used instead of the server in offline mode. In incremental
+        mode, only reviews updated since previous run are retrieved and merged
+        into the ones already known.
+        """
+        if self.ctx.params["offline"]:
+            since, until = query.window()
+            found = server.index_filter(query)
+            if found:
+                items = self.index.find(server.name, kind, *found, since, until)
+            else:
+                if not self.index.is_saved(server.name, server_query):
+                    LOG.warning(
+                        "%s: %s was never run online, no results indexed",
+                        server.name,
+                        server_query,
+                    )
+                items = self.index.load(server.name, server_query, since, until)
+            reviews = [server.review(data) for data in items]
+            reviews = [r for r in reviews if server.is_current(query, r)]
+            # weights may have changed since reviews were indexed
+            self.scorer.rank(reviews, self.now)
+            return reviews
+
+        # resolve users while online, so the index can answer other variants
+        # of the query, like with another age, offline
+        server.index_filter(query)
+
+        delta = None
+        mark = self.index.mark(server.name, server_query)
+        if self.ctx.params["incremental"] and mark:
+            delta = server.query_since(query, kind=kind, since=mark - SYNC_OVERLAP)
+        if delta is None:
+            reviews = list(server.query(query=query, kind=kind))
+            self.scorer.rank(reviews, self.now)
+            self.index.save(server.name, kind, server_query, reviews)
+            return reviews
+
+        fetched = list(delta)
+        known = {
+            r.url: r
+            for r in map(server.review, self.index.load(server.name, server_query))
+        }
+        known.update((r.url, r) for r in fetched)
+        reviews = [r for r in known.values() if server.is_current(query, r)]
+        self.scorer.rank(reviews, self.now)
+        LOG.debug(
+            "%s: %s updated reviews fetched, %s known",
+            server.name,
+            len(fetched),
+            len(reviews),
+        )
+        self.index.save(server.name, kind, server_query, reviews, fetched)
+        return reviews
+
+    def open_index(self) -> ReviewIndex:
+        """Return local index of reviews, which is only needed to work offline."""
+        index = ReviewIndex()
+        if self.ctx.params["offline"] and not index.usable():
+            LOG.error("Unable to work offline without the index of reviews.")
+            sys.exit(RC_CONFIG_ERROR)
+        return index
+
     def header(self) -> str:
         srv_list = " ".join(s.name for s in self.servers)
         return f"[dim]GRI using {len(self.servers)} servers: {srv_list}[/]"
 
+    def prefetch(self, queries: list[Query]) -> None:
+        """Retrieve results of several queries at once, from servers able to
+        combine them in fewer requests.
+        """
+        if self.ctx.params["offline"] or self.ctx.params["incremental"]:
+            return
+        for server, future in self.fan_out(
+            lambda server: self.prefetch_server(server, queries),
+        ):
+            # errors are counted by queries which were meant to be prefetched
+            if future is None:
+                LOG.error("%s: no complete answer in time", server.name)
+
+    def prefetch_server(self, server: Server, queries: list[Query]) -> None:
+        # pylint: disable=import-outside-toplevel
+        from requests.exceptions import RequestException
+
+        pending: dict[str, Query] = {}
+        for query in queries:
+            with contextlib.suppress(NotImplementedError):
+                server_query = server.mk_query(query, kind=self.kind)
+                if (server, server_query) not in self.results:
+                    pending.setdefault(server_query, query)
+        if len(pending) < 2:
+            return
+        try:
+            with spans.span("prefetch", server=server.name, queries=len(pending)):
+                results = server.query_many(list(pending.values()), kind=self.kind)
+        except (RequestException, RuntimeError) as exc:
+            # queries will be retried, and errors counted, one by one
+            LOG.warning("%s: unable to combine queries: %s", server.name, exc)
+            return
+        for server_query, reviews in results.items():
+            server.attribute(pending[server_query], reviews)
+            self.scorer.rank(reviews, self.now)
+            self.index.save(server.name, self.kind, server_query, reviews)
+            self.results[(server, server_query)] = reviews
+
     def report(
         self,
         query: Query,
         title: str = "Reviews",
         max_score: int = 1,
         action: str | None = None,
+    ) -> None:
+        """Schedule a table report based on a query, produced by flush()."""
+        if query:
+            # retrieve only fields read by the exporter or the table renderer
+            fields = self.exporter.fields if self.exporter else TABLE_FIELDS
+            query = dataclasses.replace(query, fields=query.relevant(fields))
+        self.pending.append(
+            {"query": query, "title": title, "max_score": max_score, "action": action},
+        )
+
+    def flush(self) -> None:
+        """Produce scheduled reports, prefetching all their queries at once."""
+        if self.interval and not self.pending:
+            self.ctx.invoke(owned)
+        pending, self.pending = self.pending, []
+        self.prefetch([item["query"] for item in pending if item["query"]])
+        if self.interval:
+            self.watch(pending)
+            return
+        for item in pending:
+            self.render(**item)
+
+    def select(self, max_score: float) -> tuple[list[Review], int]:
+        """Return reviews to list, best first, and how many matched max_score."""
+        with spans.span("select", items=len(self.reviews)):
+            matches = [r for r in self.reviews if r.score <= max_score]
+            limit = self.ctx.params["limit"]
+            # only best reviews are listed, no need to order all of them
+            if limit and limit < len(matches):
+                return heapq.nsmallest(limit, matches), len(matches)
+            return sorted(matches), len(matches)
+
+    @staticmethod
+    def table(title: str | None, *, fixed: bool = False) -> Table:
+        """Return an empty report table.
+
+        Fixed tables get the same column widths whatever their rows, so that
+        tables printed one after the other stay aligned.
+        """
+        # pylint: disable=import-outside-toplevel
+        from rich import box
+        from rich.table import Table
+
+        width = dict.fromkeys(("review", "age", "score", "meta", "subject"))
+        if fixed:
+            width.update(FIXED_WIDTHS)
+        table = Table(title=title, border_style="grey15", box=box.MINIMAL, expand=True)
+        table.add_column("Review", justify="right", width=width["review"])
+        table.add_column("Age", width=width["age"])
+        table.add_column("Project/Subject", ratio=width["subject"])
+        table.add_column("Meta", ratio=width["meta"])
+        table.add_column("Score", justify="right", width=width["score"])
+        return table
+
+    def stream(self, title: str, reviews: list[Review]) -> None:
+        """Print a table report in batches of rows, each as soon as rendered.
+
+        Only one batch of rows is held at a time, instead of the whole table.
+        """
+        for start in range(0, len(reviews), STREAM_BATCH):
+            table = self.table(None if start else title, fixed=True)
+            # batches are printed as a single table, without edges between
+            table.show_header = not start
+            table.show_edge = False
+            for review in reviews[start : start + STREAM_BATCH]:
+                table.add_row(*review.as_columns(self.now))
+                LOG.debug(review.data)
+            term.print(table)
+
+    def watch(self, reports: list[dict]) -> None:
+        """Produce reports again every --interval seconds, until interrupted.
+
+        Servers and their sessions are kept, and only reviews updated since the
+        previous refresh are retrieved. Reports are displayed in place, rows
+        being rendered again only when their review changed.
+        """
+        # pylint: disable=import-outside-toplevel
+        from rich.console import Group
+        from rich.live import Live
+
+        console = term.get()
+        # recording every refresh would use more and more memory
+        console.record = False
+        # rows of each report, keyed by url, along with what they were built from
+        rows: list[dict[str, tuple]] = [{} for _ in reports]
+        with contextlib.suppress(KeyboardInterrupt), Live(
+            console=console,
+            auto_refresh=False,
+        ) as live:
+            while True:
+                tables = [
+                    self.refresh(report, known) for report, known in zip(reports, rows)
+                ]
+                live.update(Group(*tables), refresh=True)
+                # next results are merged into the ones from the index
+                self.results.clear()
+                self.late.clear()
+                self.ctx.params["incremental"] = True
+                self.cache.evict()
+                time.sleep(self.interval)
+
+    def refresh(self, report: dict, known: dict[str, tuple]) -> Table:
+        """Return table of a watched report, highlighting changes since the
+        previous refresh, whose rows are given by known and then replaced.
+        """
+        errors = self.run_query(report["query"], kind=self.kind)
+        selected, matches = self.select(report["max_score"])
+        table = self.table(report["title"])
+        current: dict[str, tuple] = {}
+        for review in selected:
+            state = (
+                review.updated,
+                review.age(self.now),
+                review.score,
+                tuple((name, label.value) for name, label in review.labels.items()),
+            )
+            style = None
+            previous = known.get(review.url)
+            if previous and previous[0] == state:
+                cells = previous[1]
+            else:
+                cells = review.as_columns(self.now)
+                if known:
+                    style = "changed" if previous else "added"
+            current[review.url] = (state, cells)
+            table.add_row(*cells, style=style)
+        # removed reviews are shown once more, and then forgotten
+        for url, (_, cells) in known.items():
+            if url not in current:
+                table.add_row(*cells, style="removed")
+        known.clear()
+        known.update(current)
+
+        table.caption = (
+            f"{len(selected)} of {matches} changes listed, "
+            f"refreshed at {datetime.datetime.now():%H:%M:%S}"
+        )
+        if errors:
+            table.caption += f", {errors} servers failed"
+        return table
+
+    def render(
+        self,
+        query: Query,
+        title: str = "Reviews",
+        max_score: int = 1,
+        action: str | None = None,
     ) -> None:
         """Produce a table report based on a query."""
         LOG.debug("Running report() for %s", query)
         if query:
             self.errors += self.run_query(query, kind=self.kind)
-        cnt = 0
+        selected, matches = self.select(max_score)
+        cnt = len(selected)
 
-        table = Table(title=title, border_style="grey15", box=box.MINIMAL, expand=True)
-        table.add_column("Review", justify="right")
-        table.add_column("Age")
-        table.add_column("Project/Subject")
-        table.add_column("Meta")
-        table.add_column("Score", justify="right")
-
-        for review in sorted(self.reviews):
-            if review.score <= max_score:
-                table.add_row(*review.as_columns())
-                if action:
-                    LOG.warning(
-                        "Performing %s on %s %s",
-                        action,
-                        review,
-                        "(dry)" if not self.ctx.params["force"] else "",
-                    )
-                    if self.ctx.params["force"]:
-                        getattr(review, action)()
-                LOG.debug(review.data)
-                cnt += 1
+        with spans.span("render", report=title, items=cnt):
+            if self.exporter:
+                for review in selected:
+                    self.exporter.write(title, review, self.now)
+                self.exporter.flush()
+                LOG.info("%s: %s of %s changes exported", title, cnt, matches)
+            # Printing empty tables makes no sense
+            elif cnt and self.ctx.params["stream"]:
+                term.print()
+                self.stream(title, selected)
+            elif cnt:
+                table = self.table(title)
+                for review in selected:
+                    table.add_row(*review.as_columns(self.now))
+                    LOG.debug(review.data)
+                term.print()
+                term.print(table)
 
-        # Printing empty tables makes no sense
-        if cnt:
-            term.print()
-            term.print(table)
+        if not self.exporter:
+            total = f" of {matches}" if cnt < matches else ""
+            term.print(f"[dim]-- {cnt}{total} changes listed {self.query_details}[/]")
 
-        term.print(f"[dim]-- {cnt} changes listed {self.query_details}[/]")
+        if action and selected:
+            self.perform(action, selected)
+
+    def profile(self, path: str | None) -> None:
+        """Print time spent in each phase of the run, saving spans to path."""
+        # pylint: disable=import-outside-toplevel
+        from rich import box
+        from rich.console import Console
+        from rich.table import Table
+
+        table = Table(title="Profile", border_style="grey15", box=box.MINIMAL)
+        for column in ("Phase", "Server", "Calls", "Total", "Max", "Items", "Bytes"):
+            table.add_column(
+                column,
+                justify="left" if column in ("Phase", "Server") else "right",
+            )
+        for total in spans.summary():
+            table.add_row(
+                total["name"],
+                total["server"],
+                str(total["calls"]),
+                f"{total['total']:.3f}s",
+                f"{total['max']:.3f}s",
+                str(total["items"] or ""),
+                str(total["bytes"] or ""),
+            )
+        # exported reviews keep standard output for themselves
+        console = Console(stderr=True) if self.exporter else term.get()
+        console.print(table)
+        if path:
+            spans.dump(path)
+            LOG.info("Profile saved to %s", path)
+
+    def perform(self, action: str, reviews: list[Review]) -> None:
+        """Perform an action on reviews concurrently, using at most --jobs
+        workers. Without --force, only tell what would be done.
+        """
+        if not self.ctx.params["force"]:
+            for review in reviews:
+                LOG.warning("Performing %s on %s (dry)", action, review)
+            return
+
+        # pylint: disable=import-outside-toplevel
+        from requests.exceptions import RequestException
+        from rich.console import Console
+        from rich.progress import Progress
+
+        failed = 0
+        # progress goes to stderr, keeping it out of recorded report
+        with Progress(
+            console=Console(stderr=True),
+            transient=True,
+        ) as progress, ThreadPoolExecutor(
+            max_workers=max(1, self.ctx.params["jobs"]),
+            thread_name_prefix="gri",
+        ) as executor:
+            task = progress.add_task(f"Performing {action}", total=len(reviews))
+            futures = {
+                executor.submit(getattr(review, action), dry=False): review
+                for review in reviews
+            }
+            for future in as_completed(futures):
+                review = futures[future]
+                try:
+                    future.result()
+                except (
+                    RequestException,
+                    RuntimeError,
+                    NotImplementedError,
+                ) as exc:
+                    LOG.error("Failed to perform %s on %s: %s", action, review, exc)
+                    failed += 1
+                progress.advance(task)
+        self.errors += failed
+        LOG.warning(
+            "Performed %s on %s reviews",
+            action,
+            len(reviews) - failed,
+        )
 
     def display_config(self) -> None:
+        # pylint: disable=import-outside-toplevel
+        from rich.markdown import Markdown
+        from yaml import dump
+
         msg = dump(  # type: ignore[call-overload]
             data=dict(self.cfg),
             default_flow_style=False,
@@ -224,7 +739,20 @@ class CustomGroup(HelpColorsGroup):
             click.core.Option(
                 ["--output", "-o"],
                 default=None,
-                help="Filename to dump the result in, currently only HTML is supported",
+                help=(
+                    "Filename to dump the result in, as HTML unless --format "
+                    "is given"
+                ),
+            ),
+            click.core.Option(
+                ["--format"],
+                default="table",
+                type=click.Choice(["table", "jsonl", "csv", "html"]),
+                help=(
+                    "Format of reports. Tables are rendered on the terminal, "
+                    "other formats are written to --output or standard output "
+                    "as reviews are produced."
+                ),
             ),
             click.core.Option(
                 ["--force", "-f"],
@@ -245,13 +773,99 @@ class CustomGroup(HelpColorsGroup):
             click.core.Option(
                 ["--user", "-u"],
                 default="self",
-                help="Query another user than self",
+                help=(
+                    "Query other users than self, as a comma separated list "
+                    "of users or of groups defined in config"
+                ),
             ),
             click.core.Option(
                 ["--config"],
                 default=CFG_FILE,
                 help=f"Config file to use, defaults to {CFG_FILE}",
             ),
+            click.core.Option(
+                ["--jobs", "-j"],
+                default=8,
+                type=int,
+                help=(
+                    "Maximum number of servers to query, or of reviews to "
+                    "perform actions on, concurrently."
+                ),
+            ),
+            click.core.Option(
+                ["--timeout"],
+                default=60.0,
+                type=float,
+                help=(
+                    "Seconds to wait for a server to answer, can be overridden "
+                    "per server using the timeout key"
+                ),
+            ),
+            click.core.Option(
+                ["--max-staleness"],
+                default=0.0,
+                type=float,
+                help=(
+                    "Seconds for which cached responses are used without "
+                    "asking the server if they are still valid"
+                ),
+            ),
+            click.core.Option(
+                ["--no-cache"],
+                default=False,
+                is_flag=True,
+                help="Do not use the on-disk HTTP cache.",
+            ),
+            click.core.Option(
+                ["--incremental"],
+                default=False,
+                is_flag=True,
+                help=(
+                    "Retrieve only reviews updated since previous run of the "
+                    "same query and merge them with previously known ones."
+                ),
+            ),
+            click.core.Option(
+                ["--offline"],
+                default=False,
+                is_flag=True,
+                help=(
+                    "Answer queries from the local index of previously "
+                    "retrieved reviews, without contacting any server."
+                ),
+            ),
+            click.core.Option(
+                ["--limit"],
+                default=0,
+                type=int,
+                help=(
+                    "Maximum number of reviews listed by each report, best "
+                    "scored first. 0 means no limit."
+                ),
+            ),
+            click.core.Option(
+                ["--stream"],
+                default=False,
+                is_flag=True,
+                help=(
+                    "Print reports in batches of rows as soon as they are "
+                    "rendered, instead of whole tables, using less memory."
+                ),
+            ),
+            click.core.Option(
+                ["--profile"],
+                default=False,
+                is_flag=True,
+                help=(
+                    "Print time spent in each phase of the run, like requests, "
+                    "parsing or rendering, per server, after reports."
+                ),
+            ),
+            click.core.Option(
+                ["--profile-json"],
+                default=None,
+                help="Also save spans measured by --profile as JSON to this file.",
+            ),
             click.core.Option(
                 ["--server", "-s"],
                 default=None,
@@ -297,11 +911,35 @@ def cli(ctx: click.Context, **kwargs):
 
 @cli.result_callback()
 def process_result(result, **kwargs):  # pylint: disable=unused-argument
+    # reports from all chained commands are produced at once
+    ctx = click.get_current_context()
+    ctx.obj.flush()
+
     output = kwargs["output"]
-    if kwargs["output"]:
+    if ctx.obj.exporter:
+        ctx.obj.exporter.close()
+        if output:
+            LOG.info("%s reviews saved to %s", ctx.obj.exporter.count, output)
+    elif output:
         term.save_html(path=output, theme=TERMINAL_THEME)
         LOG.info("Report saved to %s", output)
 
+    if kwargs["profile"] or kwargs["profile_json"]:
+        ctx.obj.profile(kwargs["profile_json"])
+
+    rc = 0
+    if ctx.obj.errors:
+        LOG.error("Finished with %s runtime errors", ctx.obj.errors)
+        rc = RC_PARTIAL_RUN
+    if ctx.obj.overdue:
+        # exiting normally would wait for servers given up on to answer
+        logging.shutdown()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(rc)
+    if rc:
+        sys.exit(rc)
+
 
 @cli.command()
 @click.pass_context
@@ -393,6 +1031,20 @@ def abandon(ctx, age):
     )
 
 
+@cli.command()
+@click.pass_context
+@click.option(
+    "--interval",
+    "-n",
+    default=60.0,
+    type=float,
+    help="default=60, number of seconds between refreshes",
+)
+def watch(ctx, interval):
+    """Refresh reports of other commands in place, until interrupted."""
+    ctx.obj.interval = interval
+
+
 @cli.command()
 @click.pass_context
 def config(ctx):
@@ -416,5 +1068,8 @@ def cli_bugs(ctx: click.Context, **kwargs):
     ctx.obj = AppIssues(ctx=ctx)
 
 
+cli_bugs.result_callback()(process_result)
+
+
 if __name__ == "__main__":
     cli()  # pylint: disable=no-value-for-parameter
@@ -1,10 +1,44 @@
+from __future__ import annotations
+
 import datetime
 from abc import ABC, abstractmethod
-from collections.abc import Iterator
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 from gri.console import link
-from gri.label import Label
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from gri.label import Label
+
+# Used when the server entry in config does not define max-results
+DEFAULT_MAX_RESULTS = 1000
+
+
+# Fields of reviews needed to render them as table rows
+TABLE_FIELDS = frozenset({"labels", "mergeable"})
+# Fields only known for open reviews, and queries never matching open ones
+OPEN_FIELDS = frozenset({"mergeable"})
+CLOSED_QUERIES = frozenset({"merged", "project_merged"})
+
+
+def utcnow() -> datetime.datetime:
+    """Return current time as naive UTC, like update times of reviews."""
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def chunked(names: list[str], max_length: int) -> list[list[str]]:
+    """Split names in groups whose combined length stays under max_length."""
+    chunks: list[list[str]] = [[]]
+    length = 0
+    for name in names:
+        if chunks[-1] and length + len(name) > max_length:
+            chunks.append([])
+            length = 0
+        chunks[-1].append(name)
+        length += len(name) + 1
+    return chunks
 
 
 @dataclass
@@ -12,16 +46,108 @@ class Query:
     name: str
     age: int = 0
     project_name: str = ""
+    # fields of reviews needed by whatever consumes query results
+    fields: frozenset[str] = TABLE_FIELDS
+
+    def relevant(self, fields: frozenset[str]) -> frozenset[str]:
+        """Return those of fields which reviews matched by the query have."""
+        if self.name in CLOSED_QUERIES:
+            return fields - OPEN_FIELDS
+        return fields
+
+    def window(self) -> tuple[datetime.datetime | None, datetime.datetime | None]:
+        """Return range of update times, as naive UTC, matched by the query."""
+        if not self.age:
+            return None, None
+        cutoff = utcnow() - datetime.timedelta(days=self.age)
+        # abandon looks for reviews older than age, others look back age days
+        if self.name == "abandon":
+            return None, cutoff
+        return cutoff, None
 
 
 class Server(ABC):  # pylint: disable=too-few-public-methods
-    def __init__(self) -> None:
+    def __init__(self, cfg: dict | None = None) -> None:
         self.name = "Unknown"
+        # server entry from config file, may contain backend specific keys
+        self.cfg: dict = cfg or {}
+        # connect and read timeouts, in seconds
+        self.timeout: tuple[float, float | None] | None = None
 
     @abstractmethod
-    def query(self, query: Query, kind: str = "review") -> list:
+    def query(self, query: Query, kind: str = "review") -> Iterable[Review]:
+        raise NotImplementedError
+
+    def query_many(
+        self,
+        queries: list[Query],  # pylint: disable=unused-argument
+        kind: str = "review",  # pylint: disable=unused-argument
+    ) -> dict[str, list[Review]]:
+        """Perform several queries at once, when server is able to combine them
+        in fewer requests. Results are keyed by the mk_query() string.
+        """
+        return {}
+
+    def query_since(
+        self,
+        query: Query,  # pylint: disable=unused-argument
+        kind: str,  # pylint: disable=unused-argument
+        since: datetime.datetime,  # pylint: disable=unused-argument
+    ) -> Iterable[Review] | None:
+        """Return reviews updated after since which may have joined or left
+        query results, or None when query cannot be synced incrementally.
+        """
+        return None
+
+    def is_current(self, query: Query, review: Review) -> bool:
+        """Tell if a review previously returned by query would still match it."""
+        since, until = query.window()
+        if since and review.updated < since:
+            return False
+        return not (until and review.updated > until)
+
+    def split_query(self, query: Query, kind: str) -> list[str]:
+        """Return queries actually sent to the server for a query, which is
+        split when it would not fit a single request, like when matching many
+        users. Its results are those of all of them.
+        """
+        return [self.mk_query(query, kind=kind)]
+
+    def attribute(
+        self,
+        query: Query,  # pylint: disable=unused-argument
+        reviews: list[Review],  # pylint: disable=unused-argument
+    ) -> None:
+        """Set users of reviews to those of --user they were found for, when
+        several users were queried at once.
+        """
+        return
+
+    def index_filter(
+        self,
+        query: Query,  # pylint: disable=unused-argument
+    ) -> tuple[str, list[str]] | None:
+        """Return status and owners of reviews matched by a query, along with
+        its update window, so the index can answer it without having stored
+        its results, or None when it cannot.
+        """
+        return None
+
+    def review(self, data: dict) -> Review:
+        """Recreate a review from data previously returned by the server."""
         raise NotImplementedError
 
+    def max_results(self, query: Query) -> int:
+        """Return the maximum number of results to retrieve for a query.
+
+        The max-results key of a server entry can be either a number or a
+        mapping from command name to number, with an optional default key.
+        """
+        value = self.cfg.get("max-results", DEFAULT_MAX_RESULTS)
+        if isinstance(value, dict):
+            value = value.get(query.name, value.get("default", DEFAULT_MAX_RESULTS))
+        return int(value)
+
     @abstractmethod
     def mk_query(self, query: Query, kind: str) -> str:
         raise NotImplementedError
@@ -30,6 +156,24 @@ class Server(ABC):  # pylint: disable=too-few-public-methods
 class Review:  # pylint: disable=too-many-instance-attributes
     """Defines a change-request or pull-request."""
 
+    __slots__ = (
+        "score",
+        "data",
+        "title",
+        "starred",
+        "url",
+        "number",
+        "is_wip",
+        "project",
+        "branch",
+        "topic",
+        "labels",
+        "owner",
+        "server",
+        "updated",
+        "users",
+    )
+
     def __init__(self, data: dict, server) -> None:
         self.score = 1.0
         self.data = data
@@ -42,12 +186,16 @@ class Review:  # pylint: disable=too-many-instance-attributes
         self.branch = "master"
         self.topic = ""
         self.labels: dict[str, Label] = {}
+        self.owner = ""
         self.server = server
+        # users of --user review was found for, when querying several of them
+        self.users: tuple[str, ...] = ()
 
-    def age(self) -> int:
-        """Return how many days passed since last update was made."""
-        time_now = datetime.datetime.now()
-        return int((time_now - self.updated).days)
+    def age(self, now: datetime.datetime) -> int:
+        """Return how many days passed since last update was made, until now,
+        which is taken once per run so that all reviews of a run agree.
+        """
+        return (now - self.updated).days
 
     def __repr__(self) -> str:
         return str(self.number)
@@ -65,7 +213,7 @@ class Review:  # pylint: disable=too-many-instance-attributes
     def colorize(self, text: str) -> str:
         return text
 
-    def as_columns(self) -> list:
+    def as_columns(self, now: datetime.datetime) -> list:
         """Return review info as columns with rich text."""
         result = []
 
@@ -75,7 +223,8 @@ class Review:  # pylint: disable=too-many-instance-attributes
 
         result.append(f"{star}{self.colorize(link(self.url, self.number))}")
 
-        result.append(f"[dim]{self.age():3}[/]" if self.age() else "")
+        age = self.age(now)
+        result.append(f"[dim]{age:3}[/]" if age else "")
 
         msg = f"[{ 'wip' if self.is_wip else 'normal' }]{self.short_project()}[/]"
 
@@ -85,6 +234,9 @@ class Review:  # pylint: disable=too-many-instance-attributes
         # description/detail column
         msg += f"[dim]: {self.title}[/]"
 
+        if self.users:
+            msg += f" [user]{', '.join(self.users)}[/]"
+
         if self.topic:
             topic_url = f"{self.server.url}#/q/topic:{self.topic}+(status:open+OR+status:merged)"
             msg += f" {link(topic_url, self.topic)}"
@@ -122,8 +274,11 @@ class Review:  # pylint: disable=too-many-instance-attributes
         raise NotImplementedError
 
     def __lt__(self, other) -> bool:
-        return self.score >= other.score
+        # best scored reviews come first, url keeps the order total
+        if self.score != other.score:
+            return self.score > other.score
+        return self.url < other.url
 
     def abandon(self, *, dry: bool = True) -> None:
-        # shell out here because HTTPS api to abandon can fail
+        """Abandon review using server api, unless dry."""
         raise NotImplementedError
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import TYPE_CHECKING
+
+import requests
+
+from gri import spans
+from gri.constants import CACHE_DIR
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+LOG = logging.getLogger(__package__)
+
+# Entries not used for a week are dropped, as are the oldest ones above 100MB
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+
+
+class HttpCache:
+    """On-disk cache of HTTP responses, keyed by server and request url.
+
+    Cached responses are revalidated using If-None-Match/If-Modified-Since,
+    unless they are younger than max_staleness seconds, in which case they are
+    served without touching the network at all.
+    """
+
+    def __init__(
+        self,
+        path: str = CACHE_DIR,
+        ttl: float = DEFAULT_TTL,
+        max_size: int = DEFAULT_MAX_SIZE,
+        max_staleness: float = 0,
+        *,
+        enabled: bool = True,
+    ) -> None:
+        self.path = os.path.join(os.path.expanduser(path), "http")
+        self.ttl = ttl
+        self.max_size = max_size
+        self.max_staleness = max_staleness
+        self.enabled = enabled
+        if enabled:
+            os.makedirs(self.path, exist_ok=True)
+
+    def get(
+        self,
+        session: requests.Session,
+        url: str,
+        server: str = "",
+        params: Mapping | None = None,
+        **kwargs,
+    ) -> requests.Response:
+        """Perform a GET request, reusing cached response when possible."""
+        with spans.span("request", server=server, url=url) as span:
+            response = self._get(session, url, server, params, **kwargs)
+            span["status"] = response.status_code
+            # until headers were received: connection, TLS and server time
+            span["wait"] = response.elapsed.total_seconds()
+            return response
+
+    def _get(
+        self,
+        session: requests.Session,
+        url: str,
+        server: str,
+        params: Mapping | None,
+        **kwargs,
+    ) -> requests.Response:
+        if not self.enabled:
+            return session.get(url, params=params, **kwargs)
+        full_url = requests.Request("GET", url, params=params).prepare().url or url
+        key = hashlib.sha256(f"{server}\n{full_url}".encode()).hexdigest()
+        meta = self._load_meta(key)
+
+        if meta and time.time() - meta["stored"] <= self.max_staleness:
+            LOG.debug("Using cached response for %s", full_url)
+            return self._response(key, meta)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = session.get(full_url, headers=headers, **kwargs)
+        if response.status_code == requests.codes.not_modified and meta:
+            LOG.debug("Cached response for %s is still valid", full_url)
+            meta["stored"] = time.time()
+            self._write(f"{key}.json", json.dumps(meta).encode())
+            return self._response(key, meta)
+
+        if response.ok and kwargs.get("stream"):
+            self._store_stream(key, response)
+        elif response.ok:
+            self._store(key, response)
+        return response
+
+    def evict(self) -> None:
+        """Remove expired entries and the oldest ones above the size limit."""
+        if not self.enabled:
+            return
+        entries = []
+        now = time.time()
+        with os.scandir(self.path) as scan:
+            for entry in scan:
+                if not entry.name.endswith(".body"):
+                    continue
+                stat = entry.stat()
+                if now - stat.st_mtime > self.ttl:
+                    self._remove(entry.name[:-5])
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, entry.name[:-5]))
+
+        size = sum(e[1] for e in entries)
+        for _, entry_size, key in sorted(entries):
+            if size <= self.max_size:
+                break
+            self._remove(key)
+            size -= entry_size
+
+    def _load_meta(self, key: str) -> dict | None:
+        if not os.path.exists(os.path.join(self.path, f"{key}.body")):
+            return None
+        try:
+            with open(os.path.join(self.path, f"{key}.json"), encoding="utf-8") as f:
+                return dict(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def _response(self, key: str, meta: dict) -> requests.Response:
+        response = requests.Response()
+        with open(os.path.join(self.path, f"{key}.body"), "rb") as f:
+            response._content = f.read()  # noqa: SLF001
+        # touch body, so eviction sees it as recently used
+        os.utime(os.path.join(self.path, f"{key}.body"))
+        response._content_consumed = True  # type: ignore[attr-defined] # noqa: SLF001
+        response.status_code = requests.codes.ok
+        response.headers.update(meta.get("headers", {}))
+        response.url = meta["url"]
+        response.encoding = meta.get("encoding") or "utf-8"
+        return response
+
+    def _store(self, key: str, response: requests.Response) -> None:
+        # body first, so meta never points to a missing or partial body
+        self._write(f"{key}.body", response.content)
+        self._write(f"{key}.json", json.dumps(self._meta(response)).encode())
+
+    def _store_stream(self, key: str, response: requests.Response) -> None:
+        """Store body of a streamed response while it is being consumed."""
+        iter_content = response.iter_content
+
+        def tee(chunk_size=1, decode_unicode=False):  # noqa: FBT002
+            fd, tmp = tempfile.mkstemp(dir=self.path)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in iter_content(
+                        chunk_size,
+                        decode_unicode=decode_unicode,
+                    ):
+                        f.write(chunk)
+                        yield chunk
+                os.replace(tmp, os.path.join(self.path, f"{key}.body"))
+            finally:
+                # body was not entirely consumed
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(tmp)
+            self._write(f"{key}.json", json.dumps(self._meta(response)).encode())
+
+        response.iter_content = tee  # type: ignore[method-assign]
+
+    @staticmethod
+    def _meta(response: requests.Response) -> dict:
+        return {
+            "url": response.url,
+            "stored": time.time(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "encoding": response.encoding,
+            "headers": {
+                k: v
+                for k, v in response.headers.items()
+                if k.lower() in ("content-type", "link")
+            },
+        }
+
+    def _write(self, name: str, data: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.path)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, os.path.join(self.path, name))
+
+    def _remove(self, key: str) -> None:
+        for ext in (".json", ".body"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.path, f"{key}{ext}"))
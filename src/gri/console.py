@@ -1,15 +1,16 @@
+from __future__ import annotations
+
 import logging
 import sys
+from typing import TYPE_CHECKING, Any
 
-import rich
-from enrich.console import Console
-from enrich.logging import RichHandler
-from rich.console import ConsoleOptions, RenderResult
-from rich.markdown import CodeBlock, Markdown
-from rich.syntax import Syntax
 from rich.terminal_theme import TerminalTheme
-from rich.theme import Theme
 
+if TYPE_CHECKING:
+    from enrich.console import Console
+
+# rich consoles, markdown and logging are only imported by bootstrap(), so
+# commands like --help or shell completion start without paying for them.
 TERMINAL_THEME = TerminalTheme(
     (13, 21, 27),
     (220, 220, 220),
@@ -34,21 +35,33 @@ TERMINAL_THEME = TerminalTheme(
         (255, 255, 255),  # white
     ],
 )
-theme = Theme(
-    {
-        "normal": "",  # No or minor danger
-        "moderate": "yellow",  # Moderate danger
-        "considerable": "dark_orange",  # Considerable danger
-        "high": "red",  # High danger
-        "veryhigh": "dim red",  # Very high danger
-        "branch": "magenta",
-        "wip": "bold yellow",
-    },
-)
+THEME_STYLES = {
+    "normal": "",  # No or minor danger
+    "moderate": "yellow",  # Moderate danger
+    "considerable": "dark_orange",  # Considerable danger
+    "high": "red",  # High danger
+    "veryhigh": "dim red",  # Very high danger
+    "branch": "magenta",
+    "wip": "bold yellow",
+    "added": "green",  # rows of reviews added since previous refresh
+    "changed": "yellow",
+    "removed": "dim strike",
+    "user": "cyan",
+}
 
 
-def bootstrap() -> Console:
+def bootstrap(*, record: bool = False) -> Console:
+    # pylint: disable=import-outside-toplevel
+    import rich.highlighter
+    from enrich.console import Console
+    from enrich.logging import RichHandler
+    from rich.markdown import Markdown
+    from rich.theme import Theme
+
+    from gri.markdown import MyCodeBlock
+
     Markdown.elements["code_block"] = MyCodeBlock
+    theme = Theme(THEME_STYLES)
 
     # We also initialize the logging console
     logging_console = Console(file=sys.stderr, force_terminal=1, theme=theme)
@@ -67,12 +80,29 @@ def bootstrap() -> Console:
     return Console(
         theme=theme,
         highlighter=rich.highlighter.ReprHighlighter(),
-        record=True,
+        # keeping every rendered segment is only needed to export them
+        record=record,
         soft_wrap=True,
         redirect=True,
     )
 
 
+class LazyConsole:
+    """Console created, along with logging setup, only when first used."""
+
+    def __init__(self) -> None:
+        self._console: Console | None = None
+
+    def get(self, *, record: bool = False) -> Console:
+        """Return the console, which records output when first asked to."""
+        if self._console is None:
+            self._console = bootstrap(record=record)
+        return self._console
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+
 def link(url: str, name: str) -> str:
     return f"[link={url}]{name}[/link]"
 
@@ -99,16 +129,3 @@ def get_logging_level(ctx) -> int:
     elif verbosity < -1:
         level = logging.ERROR  # 40
     return level
-
-
-# pylint: disable=too-few-public-methods
-class MyCodeBlock(CodeBlock):
-    # pylint: disable=unused-argument
-    def __rich_console__(
-        self,
-        console: rich.console.Console,
-        options: ConsoleOptions,
-    ) -> RenderResult:
-        code = str(self.text).rstrip()
-        syntax = Syntax(code, self.lexer_name, theme=self.theme)
-        yield syntax
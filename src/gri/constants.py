@@ -1,3 +1,8 @@
+import os
+
 RC_PARTIAL_RUN = 2
 RC_CONFIG_ERROR = 3
 RC_API_FAILURE = 4
+
+# Respect XDG_CACHE_HOME
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", "~/.cache"), "gri")
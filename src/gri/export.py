@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import csv
+import html
+import json
+import sys
+from typing import TYPE_CHECKING, Any, TextIO
+
+if TYPE_CHECKING:
+    import datetime
+
+    from gri.abc import Review
+
+# Fields of exported reviews, in the order of CSV and HTML columns. Labels
+# map names to values, and updated is an ISO 8601 time in UTC.
+FIELDS = (
+    "report",
+    "server",
+    "number",
+    "url",
+    "project",
+    "branch",
+    "topic",
+    "title",
+    "owner",
+    "status",
+    "wip",
+    "mergeable",
+    "starred",
+    "updated",
+    "age",
+    "score",
+    "labels",
+    "users",
+)
+HTML_HEADER = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>gri</title>
+<style>
+body {{ font-family: sans-serif; }}
+table {{ border-collapse: collapse; }}
+th, td {{ padding: 2px 6px; border-bottom: 1px solid #ddd; text-align: left; }}
+</style>
+</head>
+<body>
+<table>
+<thead><tr>{columns}</tr></thead>
+<tbody>
+"""
+HTML_FOOTER = """</tbody>
+</table>
+</body>
+</html>
+"""
+
+
+def record(report: str, review: Review, now: datetime.datetime) -> dict[str, Any]:
+    """Return fields of a review, as listed by a report made at now."""
+    return {
+        "report": report,
+        "server": review.server.name,
+        "number": review.number,
+        "url": review.url,
+        "project": review.project,
+        "branch": review.branch,
+        "topic": review.topic or "",
+        "title": review.title,
+        "owner": review.owner,
+        "status": review.status,
+        "wip": review.is_wip,
+        # not known for pull requests retrieved using the REST api
+        "mergeable": getattr(review, "mergeable", None),
+        "starred": review.starred,
+        "updated": review.updated.isoformat(),
+        "age": review.age(now),
+        "score": round(review.score, 4),
+        "labels": {name: label.value for name, label in review.labels.items()},
+        # users of --user review was found for, when querying several of them
+        "users": list(review.users),
+    }
+
+
+def labels_text(labels: dict[str, int]) -> str:
+    """Return labels as space separated NAME:VALUE pairs, for flat formats."""
+    return " ".join(f"{name}:{value}" for name, value in labels.items())
+
+
+class Exporter:
+    """Writes reviews to a file as soon as reports produce them."""
+
+    # fields of reviews read by record(), to be retrieved by queries
+    fields = frozenset({"labels", "mergeable"})
+
+    def __init__(self, file: TextIO) -> None:
+        self.file = file
+        self.count = 0
+
+    def write(self, report: str, review: Review, now: datetime.datetime) -> None:
+        self.count += 1
+
+    def flush(self) -> None:
+        """Make written reviews available to readers, at the end of a report."""
+        self.file.flush()
+
+    def close(self) -> None:
+        if self.file is stdout():
+            self.file.flush()
+        else:
+            self.file.close()
+
+
+class JsonLinesExporter(Exporter):
+    """Writes a JSON object per review and per line."""
+
+    def write(self, report: str, review: Review, now: datetime.datetime) -> None:
+        super().write(report, review, now)
+        self.file.write(json.dumps(record(report, review, now)) + "\n")
+
+
+class CsvExporter(Exporter):
+    """Writes a CSV row per review, labels being listed as NAME:VALUE pairs."""
+
+    def __init__(self, file: TextIO) -> None:
+        super().__init__(file)
+        self.writer = csv.DictWriter(file, fieldnames=FIELDS)
+        self.writer.writeheader()
+
+    def write(self, report: str, review: Review, now: datetime.datetime) -> None:
+        super().write(report, review, now)
+        row = record(report, review, now)
+        row["labels"] = labels_text(row["labels"])
+        row["users"] = " ".join(row["users"])
+        self.writer.writerow(row)
+
+
+class HtmlExporter(Exporter):
+    """Writes an HTML table row per review, without rendering it to terminal."""
+
+    def __init__(self, file: TextIO) -> None:
+        super().__init__(file)
+        columns = "".join(f"<th>{field}</th>" for field in FIELDS)
+        self.file.write(HTML_HEADER.format(columns=columns))
+
+    def write(self, report: str, review: Review, now: datetime.datetime) -> None:
+        super().write(report, review, now)
+        row = record(report, review, now)
+        row["labels"] = labels_text(row["labels"])
+        row["users"] = " ".join(row["users"])
+        cells = {field: html.escape(str(value)) for field, value in row.items()}
+        cells["url"] = f'<a href="{cells["url"]}">{cells["url"]}</a>'
+        self.file.write(
+            "<tr>" + "".join(f"<td>{cell}</td>" for cell in cells.values()) + "</tr>\n",
+        )
+
+    def close(self) -> None:
+        self.file.write(HTML_FOOTER)
+        super().close()
+
+
+EXPORTERS: dict[str, type[Exporter]] = {
+    "jsonl": JsonLinesExporter,
+    "csv": CsvExporter,
+    "html": HtmlExporter,
+}
+
+
+def stdout() -> TextIO:
+    """Return standard output, which consoles may have redirected to logging."""
+    return getattr(sys.stdout, "rich_proxied_file", sys.stdout)
+
+
+def open_exporter(fmt: str, path: str | None) -> Exporter:
+    """Return exporter writing reviews in fmt to path, or to standard output."""
+    if not path or path == "-":
+        return EXPORTERS[fmt](stdout())
+    # csv module handles line endings itself
+    return EXPORTERS[fmt](open(path, "w", encoding="utf-8", newline=""))  # noqa: SIM115
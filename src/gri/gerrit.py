@@ -1,17 +1,31 @@
+from __future__ import annotations
+
+import codecs
 import datetime
 import json
 import logging
 import netrc
 import os
+import queue
 import re
-from urllib.parse import urlencode, urlparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+from urllib.parse import quote, urlencode, urlparse
 
-import requests
 from requests.auth import HTTPBasicAuth, HTTPDigestAuth
+from requests.exceptions import HTTPError, RequestException
 
-from gri.abc import Query, Review, Server
+from gri import spans, transport
+from gri.abc import Query, Review, Server, chunked
 from gri.label import Label
 
+if TYPE_CHECKING:
+    from collections.abc import Collection, Iterable, Iterator
+
+    import requests
+
 LOG = logging.getLogger(__package__)
 
 # Used only to force outdated Digest auth for servers not using standard auth
@@ -21,24 +35,197 @@ KNOWN_SERVERS: dict[str, dict] = {
         "verify": False,
     },
 }
+# Number of changes requested per page, unless page-size is configured
+DEFAULT_PAGE_SIZE = 200
+# Query options needed to provide optional fields of changes
+FIELD_OPTIONS = {
+    "labels": "LABELS",
+    "detailed_labels": "DETAILED_LABELS",
+    "footers": "COMMIT_FOOTERS",
+    "messages": "MESSAGES",
+    "owner": "DETAILED_ACCOUNTS",
+}
+# Query options preventing server from computing fields nobody needs
+SKIP_OPTIONS = {"mergeable": "SKIP_MERGEABLE", "diffstat": "SKIP_DIFFSTAT"}
+# Fields of changes provided only when the matching skip option was not used
+LAZY_FIELDS = {
+    "mergeable": "mergeable",
+    "insertions": "diffstat",
+    "deletions": "diffstat",
+}
+# Size of response chunks handed to the JSON parser while they are received
+CHUNK_SIZE = 64 * 1024
+# Prefix Gerrit uses to protect its JSON responses against XSSI
+XSSI_PREFIX = ")]}'"
+# Number of queries combined in a single request, keeping urls short
+MAX_BATCH_QUERIES = 10
+# Length of user names combined in a single query, for the same reason
+MAX_USERS_LENGTH = 1000
+# Queries made on behalf of users, with the operator matching each of them
+USER_QUERIES = {
+    "owned": ("owner", "status:open {users}"),
+    "incoming": ("reviewer", "{users} status:open"),
+    "watched": ("watchedby", "{users} status:open"),
+    "abandon": ("owner", "status:open age:{age}d {users}"),
+    "merged": ("owner", "status:merged -age:{age}d {users}"),
+}
+# Number of users resolved in parallel, and account id remembered for users
+# the server does not know, so they are not looked up on every run
+ACCOUNT_WORKERS = 8
+UNKNOWN_ACCOUNT = ""
+# Status of changes matched by queries which only filter on owner and age
+INDEX_STATUSES = {"owned": "NEW", "abandon": "NEW", "merged": "MERGED"}
+# Queries whose results can be updated using only recently updated changes
+INCREMENTAL_QUERIES = ("owned", "incoming", "merged", "project_merged")
+STATUS_AGE_RE = re.compile(r"\s*(status|-?age):\S+")
+# Message recorded on changes abandoned for being too old
+ABANDON_MESSAGE = "Abandoned as too old."
+GERRIT_STATUS = {"open": "NEW", "merged": "MERGED", "abandoned": "ABANDONED"}
+WIP_RE = re.compile(r"^\[?(WIP|DNM|POC).+$", re.IGNORECASE)
 LOG = logging.getLogger(__package__)
 
 
+class JsonArrayStream:
+    """Incremental parser of a JSON array received as chunks of bytes.
+
+    Elements of the array are decoded and returned as soon as they were
+    entirely received, so they can be used while the rest of the response is
+    still being downloaded, without ever holding its whole text in memory.
+    Bytes received, elements parsed and seconds spent waiting for chunks and
+    decoding elements are counted, for profiling.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], prefix: str = XSSI_PREFIX) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.received = 0
+        self.count = 0
+        self.waiting = 0.0
+        self.parsing = 0.0
+        while len(self._buf) < len(prefix) and self._fill():
+            pass
+        if not self._buf.startswith(prefix):
+            msg = f"Unexpected response start: {self._buf[:20]!r}"
+            raise RuntimeError(msg)
+        self._pos = len(prefix)
+
+    def items(self) -> Iterator:
+        """Yield elements of the array."""
+        yield from self._items()
+        self._close()
+
+    def groups(self) -> Iterator[Iterator]:
+        """Yield elements of an array of arrays, as one iterator per array.
+
+        Each of them must be consumed before requesting the next one.
+        """
+        self._expect("[")
+        if self._peek() != "]":
+            while True:
+                yield self._items()
+                if self._expect(",]") == "]":
+                    break
+        else:
+            self._pos += 1
+        self._close()
+
+    def _items(self) -> Iterator:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            self.count += 1
+            if self._expect(",]") == "]":
+                return
+
+    def _close(self) -> None:
+        # consume the rest of the response, so it can be cached
+        while self._fill():
+            pass
+        if self._buf[self._pos :].strip():
+            msg = "Unexpected data after JSON response"
+            raise RuntimeError(msg)
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        start = time.perf_counter()
+        chunk = next(self._chunks, None)
+        self.waiting += time.perf_counter() - start
+        if chunk is None:
+            self._eof = True
+            text = self._decoder.decode(b"", final=True)
+        else:
+            self.received += len(chunk)
+            text = self._decoder.decode(chunk)
+        # drop what was already parsed, buffer holds at most one element
+        self._buf = self._buf[self._pos :] + text
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                msg = "Truncated JSON response"
+                raise RuntimeError(msg)
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if char not in chars:
+            msg = f"Unexpected {char!r} in JSON response"
+            raise RuntimeError(msg)
+        self._pos += 1
+        return char
+
+    def _value(self):
+        self._peek()
+        while True:
+            start = time.perf_counter()
+            try:
+                value, end = self._json.raw_decode(self._buf, self._pos)
+            except ValueError:
+                end = -1
+            self.parsing += time.perf_counter() - start
+            # a value ending with the buffer might continue in next chunk
+            if 0 <= end < len(self._buf) or (end >= 0 and self._eof):
+                self._pos = end
+                return value
+            if not self._fill():
+                msg = "Truncated JSON response"
+                raise RuntimeError(msg)
+
+
 # pylint: disable=too-few-public-methods
 class GerritServer(Server):
-    def __init__(self, url: str, name: str = "", ctx=None) -> None:
-        super().__init__()
+    def __init__(self, url: str, name: str = "", ctx=None, cfg=None) -> None:
+        super().__init__(cfg)
         self.url = url
         self.ctx = ctx
         self.name = name
+        self.timeout = transport.timeouts(
+            self.cfg,
+            ctx.params["timeout"] if ctx else None,
+        )
         parsed_uri = urlparse(url)
         if not name:
             self.name = parsed_uri.netloc
         self.auth_class = HTTPBasicAuth
         self.hostname = parsed_uri.netloc
+        # cleared when server rejects SKIP_MERGEABLE/SKIP_DIFFSTAT options
+        self.skip_options = self.cfg.get("skip-options", True)
 
         # name is only used as an acronym
-        self.__session = requests.Session()
+        self.__session = transport.session()
 
         if self.url in KNOWN_SERVERS:
             self.auth_class = KNOWN_SERVERS[url]["auth"]
@@ -71,40 +258,423 @@ class GerritServer(Server):
             },
         )
 
-    def query(self, query: Query, kind="review") -> list:
+    def query(self, query: Query, kind="review") -> Iterator[ChangeRequest]:
         # Gerrit knows only about reviews
         if kind != "review":
-            return []
+            return
 
-        gerrit_query = self.mk_query(query, kind=kind)
+        yield from self.reviews(
+            self.split_query(query, kind=kind),
+            self.max_results(query),
+            self.fields(query),
+        )
 
-        payload = [
-            ("q", gerrit_query),
-            ("o", "LABELS"),
-            ("o", "COMMIT_FOOTERS"),
+    def query_since(
+        self,
+        query: Query,
+        kind: str,
+        since: datetime.datetime,
+    ) -> Iterator[ChangeRequest] | None:
+        # abandon and draft results also change without changes being updated
+        if kind != "review" or query.name not in INCREMENTAL_QUERIES:
+            return None
+        # drop status and age filters so changes leaving the results are seen
+        return self.reviews(
+            [
+                STATUS_AGE_RE.sub("", gerrit_query).strip()
+                + f' after:"{since:%Y-%m-%d %H:%M:%S}"'
+                for gerrit_query in self.split_query(query, kind=kind)
+            ],
+            self.max_results(query),
+            self.fields(query),
+        )
+
+    def reviews(
+        self,
+        gerrit_queries: list[str],
+        limit: int,
+        fields: Collection[str],
+    ) -> Iterator[ChangeRequest]:
+        """Yield changes matching any of the queries, each of them once."""
+        skipped = self.skipped(fields)
+        seen: set[str] = set()
+        for gerrit_query in gerrit_queries:
+            for review in spans.timed(
+                lambda data: ChangeRequest(data=data, server=self, skipped=skipped),
+                self.changes(gerrit_query, limit, fields),
+                server=self.name,
+                query=gerrit_query,
+            ):
+                # queries of different users can match the same changes
+                if review.url in seen:
+                    continue
+                seen.add(review.url)
+                yield review
+                if len(seen) >= limit:
+                    return
+
+    def split_query(self, query: Query, kind: str) -> list[str]:
+        if query.name not in USER_QUERIES:
+            return super().split_query(query, kind)
+        return [
+            self.mk_query(query, kind=kind, users=users)
+            for users in chunked(self.ctx.obj.users, MAX_USERS_LENGTH)
         ]
+
+    def fields(self, query: Query) -> frozenset[str]:
+        """Return fields of changes needed by a query and its attribution."""
+        if query.name == "incoming" and len(self.ctx.obj.users) > 1:
+            # reviewers are only provided along with detailed labels
+            return query.fields | {"detailed_labels"}
+        return query.fields
+
+    def attribute(self, query: Query, reviews: list[Review]) -> None:
+        users = self.ctx.obj.users
+        if len(users) < 2 or query.name not in USER_QUERIES:
+            return
+        accounts = {account: user for user, account in self.accounts(users).items()}
+        for review in reviews:
+            if query.name == "incoming":
+                found = [
+                    str(account.get("_account_id"))
+                    for accounts_list in review.data.get("reviewers", {}).values()
+                    for account in accounts_list
+                ]
+            elif query.name == "watched":
+                # what users watch is private
+                continue
+            else:
+                found = [review.owner]
+            review.users = tuple(accounts[a] for a in found if a in accounts)
+
+    def accounts(self, users: list[str]) -> dict[str, str]:
+        """Return account ids of users, resolving those not known yet."""
+        index = self.ctx.obj.index
+        known = index.accounts(self.name)
+        missing = (
+            [] if self.ctx.params["offline"] else [u for u in users if u not in known]
+        )
+        resolved: dict[str, str] = {}
+        if missing:
+            with ThreadPoolExecutor(max_workers=ACCOUNT_WORKERS) as executor:
+                for user, account in zip(missing, executor.map(self.account, missing)):
+                    if account is not None:
+                        resolved[user] = account
+        if resolved:
+            index.save_accounts(self.name, resolved)
+        return {
+            user: account
+            for user, account in {**known, **resolved}.items()
+            if account != UNKNOWN_ACCOUNT
+        }
+
+    def account(self, user: str) -> str | None:
+        """Return account id of a user, UNKNOWN_ACCOUNT when server does not
+        know about it, or None when it could not tell.
+        """
+        url = f"{self.url}a/accounts/{quote(user, safe='')}"
+        LOG.debug("Retrieving %s", url)
+        try:
+            account = self.parsed(self.__session.get(url, timeout=self.timeout))
+        except HTTPError as exc:
+            LOG.warning("%s: unable to resolve user %s: %s", self.name, user, exc)
+            # unlike server or authentication errors, this is not going away
+            if exc.response is not None and exc.response.status_code == 404:
+                return UNKNOWN_ACCOUNT
+            return None
+        except (RequestException, RuntimeError) as exc:
+            LOG.warning("%s: unable to resolve user %s: %s", self.name, user, exc)
+            return None
+        return str(account["_account_id"])  # type: ignore[call-overload]
+
+    def index_filter(self, query: Query) -> tuple[str, list[str]] | None:
+        if query.name not in INDEX_STATUSES:
+            return None
+        users = self.ctx.obj.users
+        accounts = self.accounts(users)
+        if any(user not in accounts for user in users):
+            return None
+        return INDEX_STATUSES[query.name], [accounts[user] for user in users]
+
+    def is_current(self, query: Query, review: Review) -> bool:
+        status = re.search(r"status:(\w+)", self.mk_query(query, kind="review"))
+        if status and review.status != GERRIT_STATUS[status.group(1)]:
+            return False
+        return super().is_current(query, review)
+
+    def review(self, data: dict) -> ChangeRequest:
+        # skipped fields are not fetched later, as we might be offline
+        return ChangeRequest(data=data, server=self)
+
+    def query_many(
+        self,
+        queries: list[Query],
+        kind: str = "review",
+    ) -> dict[str, list[Review]]:
+        """Perform several queries using a single request for their first pages.
+
+        Gerrit accepts multiple q parameters and answers with a list of result
+        lists, in the same order. Remaining pages are retrieved per query.
+        """
+        if kind != "review":
+            return {self.mk_query(query, kind=kind): [] for query in queries}
+        limits: dict[str, int] = {}
+        fields: set[str] = set()
+        for query in queries:
+            # queries split per group of users are made on their own
+            if len(self.split_query(query, kind=kind)) > 1:
+                continue
+            limits[self.mk_query(query, kind=kind)] = self.max_results(query)
+            fields.update(self.fields(query))
+        if not limits:
+            return {}
+        skipped = self.skipped(fields)
+
+        page_size = min(
+            int(self.cfg.get("page-size", DEFAULT_PAGE_SIZE)),
+            max(limits.values()),
+        )
+        results: dict[str, list[Review]] = {}
+        gerrit_queries = list(limits)
+        for i in range(0, len(gerrit_queries), MAX_BATCH_QUERIES):
+            batch = gerrit_queries[i : i + MAX_BATCH_QUERIES]
+            pages = self.fetch_batch(batch, page_size, 0, fields)
+            for gerrit_query, page in zip(batch, pages):
+                limit = limits[gerrit_query]
+                results[gerrit_query] = list(
+                    spans.timed(
+                        lambda data: ChangeRequest(
+                            data=data,
+                            server=self,
+                            skipped=skipped,
+                        ),
+                        self.changes(gerrit_query, limit, fields, first=page),
+                        server=self.name,
+                        query=gerrit_query,
+                    ),
+                )
+        return results
+
+    def changes(
+        self,
+        gerrit_query: str,
+        limit: int,
+        fields: Collection[str],
+        first: list[dict] | None = None,
+    ) -> Iterator[dict]:
+        """Yield raw changes matching a query, retrieving them page by page.
+
+        Pages are streamed by a background thread, which parses changes while
+        they are received and keeps requesting next pages while the consumer
+        is still processing previous changes. When already retrieved, first
+        page can be given.
+        """
+        page_size = int(self.cfg.get("page-size", DEFAULT_PAGE_SIZE))
+        # bounded, so a slow consumer does not let unparsed pages pile up
+        items: queue.Queue = queue.Queue(maxsize=page_size)
+        stop = threading.Event()
+        done = object()
+
+        def put(item: object) -> bool:
+            while not stop.is_set():
+                try:
+                    items.put(item, timeout=0.1)
+                except queue.Full:
+                    continue
+                return True
+            return False
+
+        def produce() -> None:
+            try:
+                for data in self.pages(gerrit_query, limit, fields, first):
+                    if not put(data):
+                        return
+            except Exception as exc:  # noqa: BLE001
+                put(exc)
+            put(done)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while (item := items.get()) is not done:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            producer.join()
+
+    def pages(
+        self,
+        gerrit_query: str,
+        limit: int,
+        fields: Collection[str],
+        first: list[dict] | None = None,
+    ) -> Iterator[dict]:
+        """Yield raw changes matching a query, requesting one page at a time."""
+        page_size = int(self.cfg.get("page-size", DEFAULT_PAGE_SIZE))
+        page: Iterable[dict] | None = first
+        count = 0
+        while True:
+            stream = None
+            if page is None:
+                response = self.request(
+                    [gerrit_query],
+                    min(page_size, limit - count),
+                    count,
+                    fields,
+                )
+                stream = JsonArrayStream(response.iter_content(CHUNK_SIZE))
+                page = stream.items()
+            more = False
+            for data in page:
+                if count >= limit:
+                    return
+                count += 1
+                more = data.get("_more_changes", False)
+                yield data
+            if stream:
+                self.record(stream, gerrit_query)
+            if not more or count >= limit:
+                return
+            page = None
+
+    def options(self, fields: Collection[str]) -> list[str]:
+        """Return query options providing fields, and skipping unneeded ones."""
+        options = sorted({FIELD_OPTIONS[f] for f in fields if f in FIELD_OPTIONS})
+        options.extend(SKIP_OPTIONS[f] for f in self.skipped(fields))
+        return options
+
+    def skipped(self, fields: Collection[str]) -> frozenset[str]:
+        """Return fields which server can skip computing as they are unneeded."""
+        if not self.skip_options:
+            return frozenset()
+        return frozenset(f for f in SKIP_OPTIONS if f not in fields)
+
+    def fetch_batch(
+        self,
+        gerrit_queries: list[str],
+        size: int,
+        start: int,
+        fields: Collection[str],
+    ) -> list[list[dict]]:
+        """Return one page of results for each of the queries."""
+        stream = JsonArrayStream(
+            self.request(gerrit_queries, size, start, fields).iter_content(
+                CHUNK_SIZE,
+            ),
+        )
+        # results of a single query are not wrapped in a list
+        if len(gerrit_queries) == 1:
+            pages = [list(stream.items())]
+        else:
+            pages = [list(group) for group in stream.groups()]
+        self.record(stream, " OR ".join(gerrit_queries))
+        return pages
+
+    def record(self, stream: JsonArrayStream, gerrit_query: str) -> None:
+        """Record time spent receiving and parsing a response, when profiling."""
+        spans.record(
+            "transfer",
+            stream.waiting,
+            server=self.name,
+            query=gerrit_query,
+            bytes=stream.received,
+        )
+        spans.record(
+            "parse",
+            stream.parsing,
+            server=self.name,
+            query=gerrit_query,
+            items=stream.count,
+        )
+
+    def request(
+        self,
+        gerrit_queries: list[str],
+        size: int,
+        start: int,
+        fields: Collection[str],
+    ) -> requests.Response:
+        """Request one page of results for each query, body being streamed."""
+        payload = [("q", q) for q in gerrit_queries]
+        payload.extend(("o", option) for option in self.options(fields))
+        payload.extend([("n", str(size)), ("S", str(start))])
         encoded = urlencode(payload, doseq=True, safe=":")
         url = rf"{self.url}a/changes/?{encoded}"
         # %20NOT%20label:Code-Review>=0,self
-        return [
-            ChangeRequest(data=r, server=self)
-            for r in self.parsed(self.__session.get(url))
-        ]
+        LOG.debug("Retrieving %s", url)
+        response = self.ctx.obj.cache.get(
+            self.__session,
+            url,
+            server=self.name,
+            timeout=self.timeout,
+            stream=True,
+        )
+        try:
+            response.raise_for_status()
+        except HTTPError as exc:
+            # older servers reject skip options they do not know about
+            if exc.response is None or exc.response.status_code != 400:
+                raise
+            if not self.skip_options or not self.skipped(fields):
+                raise
+            LOG.info("%s does not support skip options, not using them", self.name)
+            self.skip_options = False
+            return self.request(gerrit_queries, size, start, fields)
+        return response
+
+    def fetch_change(self, number: int) -> dict:
+        """Return details of a single change, including fields queries skipped."""
+        url = f"{self.url}a/changes/{number}"
+        LOG.debug("Retrieving %s", url)
+        return self.parsed(  # type: ignore[return-value]
+            self.ctx.obj.cache.get(
+                self.__session,
+                url,
+                server=self.name,
+                timeout=self.timeout,
+            ),
+        )
+
+    def abandon_change(self, number: int, *, delete: bool = False) -> None:
+        """Abandon a change, or delete it when it is a draft."""
+        if delete:
+            url = f"{self.url}a/changes/{number}"
+            LOG.debug("Deleting %s", url)
+            response = self.__session.delete(url, timeout=self.timeout)
+        else:
+            url = f"{self.url}a/changes/{number}/abandon"
+            LOG.debug("Posting to %s", url)
+            response = self.__session.post(
+                url,
+                json={"message": ABANDON_MESSAGE},
+                timeout=self.timeout,
+            )
+        response.raise_for_status()
 
     # pylint: disable=too-many-return-statements
-    def mk_query(self, query: Query, kind: str) -> str:
-        if query.name == "owned":
-            return f"status:open owner:{self.ctx.obj.user}"
-        if query.name == "incoming":
-            return f"reviewer:{self.ctx.obj.user} status:open"
-        if query.name == "watched":
-            return f"watchedby:{self.ctx.obj.user} status:open"
-        if query.name == "abandon":
-            return f"status:open age:{query.age}d owner:{self.ctx.obj.user}"
+    def mk_query(
+        self,
+        query: Query,
+        kind: str,
+        users: list[str] | None = None,
+    ) -> str:
+        """Return query string, matching reviews of users, all those given by
+        --user unless told otherwise.
+        """
+        if query.name in USER_QUERIES:
+            operator, template = USER_QUERIES[query.name]
+            if users is None:
+                users = self.ctx.obj.users
+            terms = [
+                f'{operator}:"{user}"' if " " in user else f"{operator}:{user}"
+                for user in users
+            ]
+            matched = terms[0] if len(terms) == 1 else f"({' OR '.join(terms)})"
+            return template.format(users=matched, age=query.age)
         if query.name == "draft":
             return "status:open owner:self has:draft OR draftby:self"
-        if query.name == "merged":
-            return f"status:merged -age:{query.age}d owner:{self.ctx.obj.user}"
         if query.name == "project_merged":
             return f"{query.project_name} status:merged -age:{query.age}d"
 
@@ -114,7 +684,7 @@ class GerritServer(Server):
         )
 
     @staticmethod
-    def parsed(result) -> dict:
+    def parsed(result) -> list:
         # Can raise HTTPError, RuntimeError
         result.raise_for_status()
 
@@ -126,72 +696,64 @@ class GerritServer(Server):
 class ChangeRequest(Review):  # pylint: disable=too-many-instance-attributes
     """Defines a change-request or pull-request."""
 
-    def __init__(self, data: dict, server) -> None:
+    __slots__ = ("skipped",)
+
+    def __init__(
+        self,
+        data: dict,
+        server,
+        skipped: frozenset[str] = frozenset(),
+    ) -> None:
         super().__init__(data, server)
         LOG.debug(data)
         self.data = data
+        # fields server was asked not to compute, retrieved only when used
+        self.skipped = skipped
         self.number = data["_number"]
         self.project = data["project"]
         self.starred = data.get("starred", False)
         self.server = server
 
         self.topic = data.get("topic", "")
+        self.branch = data.get("branch", "master")
+        self.owner = str(data.get("owner", {}).get("_account_id", ""))
 
         self.title = data["subject"]
 
-        self.updated = datetime.datetime.strptime(
-            self.data["updated"][:-3],
-            "%Y-%m-%d %H:%M:%S.%f",
-        )
+        # nanoseconds are dropped, as they are not supported by datetime
+        self.updated = datetime.datetime.fromisoformat(self.data["updated"][:-3])
 
-        if re.compile("^\\[?(WIP|DNM|POC).+$", re.IGNORECASE).match(self.title):
+        if WIP_RE.match(self.title):
             self.is_wip = True
 
         self.url = f"{self.server.url}#/c/{self.number}/"
 
-        # Secret ScoreRank implementation which aims to map any review on a
-        # scale from 0 to 1, where 1 is alredy merged, and 0 is something that
-        # willnever merge.
-        #
-        # We start from perfect and downgrate rating using multiplication as
-        # this assures we stick between [0,1]
-        self.score = 1.0
-        # disabled staring as it does not effectively affect chance of merging
-        # if not self.starred:
-
-        self.labels: dict[str, Label] = {}
-
-        for label_name, label_data in data.get("labels", {}).items():
-            label = Label(label_name, label_data)
-            self.labels[label_name] = label
-
-            if label.abbr == "V" and label.value < 1:
-                self.score *= 0.8 if label.value == 0 else 0.6
-            if label.abbr == "W" and label.value < 1:
-                self.score *= 0.95 if label.value == 0 else 0.5
-            if label.abbr == "CR" and label.value < 1:
-                self.score *= 0.8 if label.value == 0 else 0.3
-
-        # penalty for reviews over 7 days old
-        if self.age() > 7:
-            self.score *= 1 - (min(365, self.age()) / 365)
-
-        # We just want to keep wip changes in the same are ~0..1 score.
-        if self.is_wip:
-            self.score *= 0.05
+        # score is computed later by ScoreRank, for all results at once
+        self.labels: dict[str, Label] = {
+            label_name: Label(label_name, label_data)
+            for label_name, label_data in data.get("labels", {}).items()
+        }
 
     def __getattr__(self, name):
+        # slots not yet assigned
+        if name in ("data", "skipped"):
+            raise AttributeError(name)
         if name in self.data:
             return self.data[name]
         if name == "number":
             return self.data["_number"]
+        # Gerrit only computes mergeability of open changes
+        if LAZY_FIELDS.get(name) in self.skipped and (
+            name != "mergeable" or self.status == "NEW"
+        ):
+            LOG.debug("Retrieving skipped %s field of %s", name, self.number)
+            self.data.update(self.server.fetch_change(self.number))
+            self.skipped = frozenset()
+            return self.data.get(name)
         return None
 
     def short_project(self) -> str:
-        match = re.search("([^/]*)$", self.project)
-        if match:
-            return match.group(0)
-        return self.project
+        return self.project.rpartition("/")[2]
 
     def colorize(self, text: str) -> str:
         style = ""
@@ -224,17 +786,12 @@ class ChangeRequest(Review):  # pylint: disable=too-many-instance-attributes
         return self.data["labels"]["Code-Review"]["value"] > 1
 
     def abandon(self, *, dry: bool = True) -> None:
-        # shell out here because HTTPS api to abandon can fail
+        # drafts cannot be abandoned, only deleted
         action = "delete" if self.draft else "abandon"
 
-        LOG.warning("Performing %s on %s", action, self.number)
+        LOG.debug("Performing %s on %s", action, self.number)
         if not dry:
-            cmd = (
-                f"ssh -p 29418 {self.server.username}"
-                f"@{self.server.hostname} gerrit review "
-                f"{self.number},1 --{action} --message too_old"
-            )
-            os.system(cmd)
+            self.server.abandon_change(self.number, delete=action == "delete")
 
     @property
     def status(self):
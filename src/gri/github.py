@@ -1,67 +1,553 @@
+from __future__ import annotations
+
 import logging
+import math
 import os
-from datetime import datetime, timedelta
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 
-import github
+from requests.exceptions import RequestException
 
-from gri.abc import Query, Review, Server
+from gri import spans, transport
+from gri.abc import Query, Review, Server, chunked, utcnow
 from gri.label import Label
+from gri.ratelimit import RateLimitedAuth, RateLimiter
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
 
 LOG = logging.getLogger(__package__)
 
+API_URL = "https://api.github.com"
+# Largest page size and number of results accepted by the search API
+MAX_PAGE_SIZE = 100
+MAX_SEARCH_RESULTS = 1000
+# Search results are split by date when a query matches more than 1000 results
+GITHUB_EPOCH = datetime(2008, 1, 1)
+MIN_SPLIT_RANGE = timedelta(seconds=2)
+# Queries whose results can be updated using only recently updated items
+INCREMENTAL_QUERIES = ("owned", "incoming", "merged")
+STATE_RE = re.compile(r"\s*is:(open|closed|merged)")
+# Queries made on behalf of users, and length of user names combined in a
+# single search, as search queries are limited to 256 characters
+USER_QUERIES = frozenset({"owned", "incoming", "watched", "abandon", "merged"})
+MAX_USERS_LENGTH = 200
+# State of pull requests matched by queries which only filter on author and
+# age, merged ones being told apart from closed ones by is_current()
+INDEX_STATUSES = {"owned": "open", "abandon": "open", "merged": "closed"}
+# Fields needed by PullRequest, retrieved by GithubGraphQLServer
+GRAPHQL_SEARCH = """
+query($q: String!, $n: Int!, $after: String) {
+  search(query: $q, type: ISSUE, first: $n, after: $after) {
+    issueCount
+    pageInfo { hasNextPage endCursor }
+    nodes {
+      ... on PullRequest {
+        number title url updatedAt state isDraft mergedAt mergeable reviewDecision
+        author { login }
+        labels(first: 20) { nodes { name } }
+        commits(last: 1) { nodes { commit { statusCheckRollup { state } } } }
+      }
+      ... on Issue {
+        number title url updatedAt state
+        author { login }
+        labels(first: 20) { nodes { name } }
+      }
+    }
+  }
+}
+"""
+# Review decision and CI status, as reported by GraphQL, mapped to labels
+REVIEW_DECISIONS = {
+    "APPROVED": {"approved": True},
+    "CHANGES_REQUESTED": {"rejected": True},
+}
+CI_STATUSES = {
+    "SUCCESS": {"approved": True},
+    "FAILURE": {"rejected": True},
+    "ERROR": {"rejected": True},
+}
+# Number of pages retrieved in parallel once total number of results is known
+PAGE_WORKERS = 4
+# Environment variable holding the token, unless token-env is configured
+DEFAULT_TOKEN_ENV = "HOMEBREW_GITHUB_API_TOKEN"  # noqa: S105
+# Rate limiters shared by servers using the same api with the same tokens
+RATE_LIMITERS: dict[tuple[str, tuple[str, ...]], RateLimiter] = {}
+
 
 class GithubServer(Server):
-    def __init__(self, url: str, name: str = "", ctx=None) -> None:
-        super().__init__()
+    def __init__(self, url: str, name: str = "", ctx=None, cfg=None) -> None:
+        super().__init__(cfg)
         self.name = name
         self.url = url
         self.ctx = ctx
-        token = os.environ.get("HOMEBREW_GITHUB_API_TOKEN")
-        self.github = github.Github(login_or_token=token)
+        self.timeout = transport.timeouts(
+            self.cfg,
+            ctx.params["timeout"] if ctx else None,
+        )
+        self.api_url = self.cfg.get("api-url", API_URL)
+        self.session = transport.session()
+        self.session.headers.update(
+            {
+                "Accept": "application/vnd.github+json",
+                "X-GitHub-Api-Version": "2022-11-28",
+            },
+        )
+        names = self.cfg.get("token-env", DEFAULT_TOKEN_ENV)
+        if isinstance(names, str):
+            names = [names]
+        tokens = tuple(os.environ[n] for n in names if os.environ.get(n))
+        key = (self.api_url, tokens)
+        if key not in RATE_LIMITERS:
+            RATE_LIMITERS[key] = RateLimiter(list(tokens))
+        self.session.auth = RateLimitedAuth(RATE_LIMITERS[key])
 
-    def query(self, query: Query, kind="review") -> list:
+    def query(self, query: Query, kind="review") -> Iterator[PullRequest]:
         LOG.debug("Called query=%s and kind=%s", query, kind)
-        reviews = []
-        limit = 50
-        results = self.github.search_issues(self.mk_query(query, kind=kind))
-        for _, item in zip(range(limit), results):
-            review = PullRequest(data=item.raw_data, server=self)
-            reviews.append(review)
-        return reviews
+        yield from self.reviews(
+            [
+                (users, *self.query_parts(query, kind=kind, users=users))
+                for users in self.user_chunks(query)
+            ],
+            self.max_results(query),
+        )
+
+    def query_since(
+        self,
+        query: Query,
+        kind: str,
+        since: datetime,
+    ) -> Iterator[PullRequest] | None:
+        if query.name not in INCREMENTAL_QUERIES:
+            return None
+        # drop state filter so pull requests leaving the results are seen
+        return self.reviews(
+            [
+                (
+                    users,
+                    STATE_RE.sub("", self.query_parts(query, kind, users)[0]).strip(),
+                    since,
+                    None,
+                )
+                for users in self.user_chunks(query)
+            ],
+            self.max_results(query),
+        )
+
+    def reviews(
+        self,
+        searches: list[tuple[list[str], str, date | None, date | None]],
+        limit: int,
+    ) -> Iterator[PullRequest]:
+        """Yield pull requests matching any of the searches, each of them once.
+
+        Searches are made for groups of users, and those made for a single
+        user record it in the found_for list of pull requests they match.
+        """
+        seen: dict[str, PullRequest] = {}
+        for users, base, since, until in searches:
+            for review in spans.timed(
+                lambda item: PullRequest(data=item, server=self),
+                self.search(base, since, until, limit),
+                server=self.name,
+                query=base,
+            ):
+                # searches of different users can match the same pull requests
+                known = seen.setdefault(review.url, review)
+                if len(users) == 1:
+                    known.data.setdefault("found_for", []).append(users[0])
+                if known is not review:
+                    continue
+                yield review
+                if len(seen) >= limit:
+                    return
+
+    def user_chunks(self, query: Query) -> list[list[str]]:
+        """Return groups of users searched together for a query."""
+        users = self.ctx.obj.users if self.ctx else ["self"]
+        if query.name not in USER_QUERIES:
+            return [users]
+        if query.name in ("incoming", "watched"):
+            # involves:a involves:b -author:a -author:b would also exclude
+            # reviews made by a of pull requests of b
+            return [[user] for user in users]
+        return chunked(users, MAX_USERS_LENGTH)
+
+    def split_query(self, query: Query, kind: str) -> list[str]:
+        return [
+            self.mk_query(query, kind=kind, users=users)
+            for users in self.user_chunks(query)
+        ]
+
+    def attribute(self, query: Query, reviews: list[Review]) -> None:
+        users = self.ctx.obj.users
+        if len(users) < 2 or query.name not in USER_QUERIES:
+            return
+        if query.name in ("incoming", "watched"):
+            # searched separately for each user, see user_chunks()
+            for review in reviews:
+                review.users = tuple(dict.fromkeys(review.data.get("found_for", [])))
+            return
+        logins = {login.lower(): user for user, login in self.accounts(users).items()}
+        for review in reviews:
+            if review.owner.lower() in logins:
+                review.users = (logins[review.owner.lower()],)
+
+    def accounts(self, users: list[str]) -> dict[str, str]:
+        """Return logins of users, resolving self using the api only once."""
+        result = {user: user for user in users if user != "self"}
+        if "self" not in users:
+            return result
+        index = self.ctx.obj.index
+        known = index.accounts(self.name)
+        if "self" not in known and not self.ctx.params["offline"]:
+            try:
+                response = self.session.get(
+                    f"{self.api_url}/user",
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+                known["self"] = response.json()["login"]
+                index.save_accounts(self.name, {"self": known["self"]})
+            except (RequestException, KeyError) as exc:
+                LOG.warning("%s: unable to resolve self: %s", self.name, exc)
+        if "self" in known:
+            result["self"] = known["self"]
+        return result
+
+    def index_filter(self, query: Query) -> tuple[str, list[str]] | None:
+        if query.name not in INDEX_STATUSES:
+            return None
+        users = self.ctx.obj.users
+        logins = self.accounts(users)
+        if any(user not in logins for user in users):
+            return None
+        return INDEX_STATUSES[query.name], [logins[user] for user in users]
+
+    def is_current(self, query: Query, review: Review) -> bool:
+        base, _, _ = self.query_parts(query, kind="review")
+        state = STATE_RE.search(base)
+        if state and state.group(1) == "open" and review.status != "open":
+            return False
+        if state and state.group(1) == "merged" and not review.merged:
+            return False
+        return super().is_current(query, review)
+
+    def review(self, data: dict) -> PullRequest:
+        return PullRequest(data=data, server=self)
+
+    def search(
+        self,
+        base: str,
+        since: date | None,
+        until: date | None,
+        limit: int,
+    ) -> Iterator[dict]:
+        """Yield search results using the fewest possible round trips.
+
+        First page tells us the total number of results, so all remaining pages
+        needed to reach the limit are requested in parallel. As the API never
+        returns more than 1000 results for a query, queries matching more than
+        that are split in two by their updated date range, recursively.
+        """
+        page_size = min(limit, MAX_PAGE_SIZE)
+        seen: set[str] = set()
+        ranges = [(since, until)]
+        with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+            while ranges:
+                queries = [base + self.updated_filter(*r) for r in ranges]
+                first_pages = executor.map(
+                    lambda q: self.fetch_page(q, 1, page_size),
+                    queries,
+                )
+                splits: list[tuple[date | None, date | None]] = []
+                for (start, end), github_query, first in zip(
+                    ranges,
+                    queries,
+                    first_pages,
+                ):
+                    if (
+                        first["total_count"] > MAX_SEARCH_RESULTS
+                        and limit - len(seen) > MAX_SEARCH_RESULTS
+                    ):
+                        halves = self.split_range(start, end)
+                        if halves:
+                            LOG.debug("Splitting %s", github_query)
+                            splits.extend(halves)
+                            continue
+                    for item in self.pages(
+                        executor,
+                        github_query,
+                        first,
+                        limit - len(seen),
+                    ):
+                        # split ranges share their boundaries
+                        if item["html_url"] in seen:
+                            continue
+                        seen.add(item["html_url"])
+                        yield item
+                        if len(seen) >= limit:
+                            return
+                ranges = splits
+
+    def pages(
+        self,
+        executor: ThreadPoolExecutor,
+        github_query: str,
+        first: dict,
+        limit: int,
+    ) -> Iterator[dict]:
+        """Yield items from first page and from pages following it."""
+        yield from first["items"]
+        page_size = len(first["items"]) or 1
+        total = min(first["total_count"], MAX_SEARCH_RESULTS, limit)
+        results = executor.map(
+            lambda page: self.fetch_page(github_query, page, page_size),
+            range(2, math.ceil(total / page_size) + 1),
+        )
+        for result in results:
+            yield from result["items"]
+
+    @staticmethod
+    def split_range(
+        since: date | None,
+        until: date | None,
+    ) -> list[tuple[date | None, date | None]]:
+        """Split an updated date range in two halves, if still possible."""
+        start = GITHUB_EPOCH
+        if isinstance(since, datetime):
+            start = since
+        elif since:
+            start = datetime.combine(since, time.min)
+        end = utcnow()
+        if isinstance(until, datetime):
+            end = until
+        elif until:
+            end = datetime.combine(until, time.max)
+        end = end.replace(microsecond=0)
+        if end - start < MIN_SPLIT_RANGE:
+            LOG.warning(
+                "Unable to split %s..%s range further, some results will be missing",
+                start,
+                end,
+            )
+            return []
+        middle = (start + (end - start) / 2).replace(microsecond=0)
+        # an open range keeps matching reviews updated while we query it
+        return [(start, middle), (middle, until and end)]
+
+    @staticmethod
+    def updated_filter(since: date | None, until: date | None) -> str:
+        def fmt(value: date) -> str:
+            if isinstance(value, datetime):
+                return value.isoformat(timespec="seconds")
+            return value.isoformat()
+
+        if since and until:
+            return f" updated:{fmt(since)}..{fmt(until)}"
+        if since:
+            return f" updated:>={fmt(since)}"
+        if until:
+            return f" updated:<={fmt(until)}"
+        return ""
+
+    def close(self, review: PullRequest) -> None:
+        """Close a pull request or issue, without merging it."""
+        # pull requests are issues too, this endpoint closes both
+        url = (
+            f"{self.api_url}/repos/{review.org}/{review.project}/issues/{review.number}"
+        )
+        LOG.debug("Closing %s using %s", review.url, url)
+        response = self.session.patch(
+            url,
+            json={"state": "closed"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+
+    def fetch_page(self, github_query: str, page: int, size: int) -> dict:
+        # https://docs.github.com/en/rest/search/search#search-issues-and-pull-requests
+        params: dict[str, str | int] = {
+            "q": github_query,
+            "per_page": size,
+            "page": page,
+        }
+        # 304 responses to conditional requests do not count against rate limit
+        response = self.ctx.obj.cache.get(
+            self.session,
+            f"{self.api_url}/search/issues",
+            server=self.name,
+            params=params,
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        with spans.span("parse", server=self.name, bytes=len(response.content)):
+            result = response.json()
+        if result.get("incomplete_results"):
+            LOG.warning(
+                "%s: incomplete results received for %s",
+                self.name,
+                github_query,
+            )
+        return result
 
     def mk_query(
         self,
         query: Query,
         kind: str = "review",
+        users: list[str] | None = None,
     ) -> str:
         """Return query string based on."""
+        base, since, until = self.query_parts(query, kind=kind, users=users)
+        return base + self.updated_filter(since, until)
+
+    def query_parts(
+        self,
+        query: Query,
+        kind: str = "review",
+        users: list[str] | None = None,
+    ) -> tuple[str, date | None, date | None]:
+        """Return query string without its updated date range, and the range.
+
+        Query matches reviews of users, all those given by --user unless told
+        otherwise, as GitHub combines repeated qualifiers using OR.
+        """
         # https://docs.github.com/en/free-pro-team@latest/github/searching-for-information-on-github/searching-issues-and-pull-requests
         kind = "is:pr" if kind == "review" else "is:issue"
 
         # we do not want results from archived repos as nobody can change them
         kind += " archived:no"
 
+        if users is None:
+            users = self.ctx.obj.users if self.ctx else ["self"]
+        logins = ["@me" if user == "self" else user for user in users]
+
+        def qualify(qualifier: str) -> str:
+            return " ".join(f"{qualifier}:{login}" for login in logins)
+
         if query.name == "owned":
-            return f"{kind} is:open author:@me"
-        if query.name == "incoming":
-            return f"{kind} is:open involves:@me -author:@me"
-        if query.name == "watched":
-            return f"{kind} is:open involves:@me -author:@me"
+            return f"{kind} is:open {qualify('author')}", None, None
+        if query.name in ("incoming", "watched"):
+            return (
+                f"{kind} is:open {qualify('involves')} {qualify('-author')}",
+                None,
+                None,
+            )
         if query.name == "abandon":
-            day = (datetime.now() - timedelta(days=query.age)).date().isoformat()
-            return f"{kind} is:open author:@me updated:<={day}"
+            day = (utcnow() - timedelta(days=query.age)).date()
+            return f"{kind} is:open {qualify('author')}", None, day
         if query.name == "draft":
-            return f"{kind} draft:true is:open author:@me"
+            return f"{kind} draft:true is:open author:@me", None, None
         if query.name == "merged":
-            day = (datetime.now() - timedelta(days=query.age)).date().isoformat()
-            return f"{kind} is:merged author:@me updated:>={day}"
+            day = (utcnow() - timedelta(days=query.age)).date()
+            return f"{kind} is:merged {qualify('author')}", day, None
 
         msg = f"Unable to build query for {query.name}"
         raise NotImplementedError(msg)
 
 
+class GithubGraphQLServer(GithubServer):
+    """GitHub backend using the GraphQL search api.
+
+    It retrieves draft state, review decision, mergeability and CI status of
+    pull requests with the search results, which the REST api would need an
+    extra request per pull request for. Pages are linked by cursors, so they
+    are retrieved sequentially.
+    """
+
+    def __init__(self, url: str, name: str = "", ctx=None, cfg=None) -> None:
+        super().__init__(url, name=name, ctx=ctx, cfg=cfg)
+        # queries are sent using POST, but can be retried like GET requests
+        self.session.mount(
+            f"{self.api_url}/graphql",
+            transport.adapter(retry_post=True),
+        )
+
+    def fetch_page(self, github_query: str, page: int, size: int) -> dict:
+        if page != 1:
+            msg = "GraphQL search pages can only be reached using cursors"
+            raise ValueError(msg)
+        return self.fetch_cursor(github_query, size, None)
+
+    def pages(
+        self,
+        executor: ThreadPoolExecutor,  # pylint: disable=unused-argument
+        github_query: str,
+        first: dict,
+        limit: int,
+    ) -> Iterator[dict]:
+        result = first
+        count = 0
+        limit = min(limit, MAX_SEARCH_RESULTS)
+        while True:
+            yield from result["items"]
+            count += len(result["items"])
+            if not result["has_next"] or count >= limit:
+                return
+            result = self.fetch_cursor(
+                github_query,
+                min(MAX_PAGE_SIZE, limit - count),
+                result["cursor"],
+            )
+
+    def fetch_cursor(self, github_query: str, size: int, cursor: str | None) -> dict:
+        url = f"{self.api_url}/graphql"
+        with spans.span("request", server=self.name, url=url) as span:
+            response = self.session.post(
+                url,
+                json={
+                    "query": GRAPHQL_SEARCH,
+                    "variables": {"q": github_query, "n": size, "after": cursor},
+                },
+                timeout=self.timeout,
+            )
+            span["status"] = response.status_code
+            span["wait"] = response.elapsed.total_seconds()
+        response.raise_for_status()
+        with spans.span("parse", server=self.name, bytes=len(response.content)):
+            result = response.json()
+        if result.get("errors"):
+            raise RuntimeError(result["errors"][0].get("message", result["errors"]))
+        search = result["data"]["search"]
+        return {
+            "total_count": search["issueCount"],
+            "items": [graphql_to_rest(node) for node in search["nodes"] if node],
+            "has_next": search["pageInfo"]["hasNextPage"],
+            "cursor": search["pageInfo"]["endCursor"],
+        }
+
+
+def graphql_to_rest(node: dict) -> dict:
+    """Convert a GraphQL search node to the shape returned by the REST api."""
+    rollup = None
+    commits = node.get("commits", {}).get("nodes")
+    if commits and commits[0]["commit"].get("statusCheckRollup"):
+        rollup = commits[0]["commit"]["statusCheckRollup"]["state"]
+    return {
+        "number": node["number"],
+        "title": node["title"],
+        "html_url": node["url"],
+        "updated_at": node["updatedAt"],
+        # REST api reports merged pull requests as closed
+        "state": "open" if node["state"] == "OPEN" else "closed",
+        "draft": node.get("isDraft", False),
+        "user": {"login": (node.get("author") or {}).get("login", "")},
+        "labels": [{"name": label["name"]} for label in node["labels"]["nodes"]],
+        "pull_request": {"merged_at": node.get("mergedAt")},
+        "mergeable": {"MERGEABLE": True, "CONFLICTING": False}.get(
+            node.get("mergeable", ""),
+        ),
+        "review_decision": node.get("reviewDecision"),
+        "ci_status": rollup,
+    }
+
+
 class PullRequest(Review):  # pylint: disable=too-many-instance-attributes
+    __slots__ = ("state", "org")
+
     def __init__(self, data: dict, server) -> None:
         super().__init__(data, server)
         self.title = data["title"]
@@ -69,11 +555,13 @@ class PullRequest(Review):  # pylint: disable=too-many-instance-attributes
         self.number = data["number"]
         self.data = data
         self.server = server
-        self.updated = datetime.strptime(self.data["updated_at"], "%Y-%m-%dT%H:%M:%SZ")
+        # fromisoformat does not accept the Z suffix before python 3.11
+        self.updated = datetime.fromisoformat(self.data["updated_at"][:-1])
         self.state = data["state"]
         path = urlparse(self.url).path.split("/")
         self.org = path[1]
         self.project = path[2]
+        self.owner = data.get("user", {}).get("login", "")
         if data.get("draft", False):
             self.is_wip = True
 
@@ -83,10 +571,31 @@ class PullRequest(Review):  # pylint: disable=too-many-instance-attributes
                 label = Label(label_data["name"], label_data)
                 self.labels[label_data["name"]] = label
 
+        # only provided by the GraphQL api
+        if data.get("review_decision"):
+            self.labels["Code-Review"] = Label(
+                "Code-Review",
+                REVIEW_DECISIONS.get(data["review_decision"], {}),
+            )
+        if data.get("ci_status"):
+            self.labels["Verified"] = Label(
+                "Verified",
+                CI_STATUSES.get(data["ci_status"], {}),
+            )
+
     @property
     def status(self):
         return self.data["state"]
 
+    def abandon(self, *, dry: bool = True) -> None:
+        LOG.debug("Closing %s", self.url)
+        if not dry:
+            self.server.close(self)
+
+    @property
+    def merged(self) -> bool:
+        return bool(self.data.get("pull_request", {}).get("merged_at"))
+
     @property
     def is_mergeable(self):
         return self.state == "open"
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import contextlib
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import TYPE_CHECKING
+
+from gri import spans
+from gri.constants import CACHE_DIR
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from gri.abc import Review
+
+LOG = logging.getLogger(__package__)
+
+# Changes updated shortly before the high-water mark are requested again, so
+# clock skew or changes updated while we were querying are not missed.
+SYNC_OVERLAP = datetime.timedelta(minutes=5)
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    server TEXT NOT NULL,
+    url TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    number TEXT NOT NULL,
+    project TEXT,
+    branch TEXT,
+    topic TEXT,
+    owner TEXT,
+    labels TEXT,
+    score REAL,
+    updated TEXT,
+    status TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (server, url)
+);
+CREATE INDEX IF NOT EXISTS reviews_owner ON reviews (server, kind, owner, status, updated);
+CREATE TABLE IF NOT EXISTS queries (
+    server TEXT NOT NULL,
+    query TEXT NOT NULL,
+    mark TEXT,
+    PRIMARY KEY (server, query)
+);
+CREATE TABLE IF NOT EXISTS results (
+    server TEXT NOT NULL,
+    query TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (server, query, url)
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    server TEXT NOT NULL,
+    user TEXT NOT NULL,
+    account TEXT NOT NULL,
+    PRIMARY KEY (server, user)
+);
+"""
+
+
+class ReviewIndex:
+    """Local SQLite index of reviews and of the queries that returned them.
+
+    It is updated after each query made to a server and allows answering the
+    same queries later without any network access. Database is only opened on
+    first use; when it cannot be used, reviews are simply not indexed.
+    """
+
+    def __init__(self, path: str = CACHE_DIR) -> None:
+        self.file = os.path.join(os.path.expanduser(path), "index.sqlite")
+        # queries are performed from worker threads, sharing one connection
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._failed = False
+
+    def usable(self) -> bool:
+        """Open the index unless already done, telling if it can be used."""
+        with self._lock:
+            return self._connect() is not None
+
+    def _connect(self) -> sqlite3.Connection | None:
+        # must be called holding the lock
+        if self._db is None and not self._failed:
+            try:
+                os.makedirs(os.path.dirname(self.file), exist_ok=True)
+                db = sqlite3.connect(self.file, check_same_thread=False)
+                with db:
+                    db.executescript(SCHEMA)
+            except (OSError, sqlite3.Error) as exc:
+                self._disable(exc)
+            else:
+                self._db = db
+        return self._db
+
+    def _disable(self, exc: Exception) -> None:
+        LOG.warning("Unable to use index %s, continuing without: %s", self.file, exc)
+        self._failed = True
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    @contextlib.contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection | None]:
+        """Hold the connection, None when index is unusable, within a
+        transaction. Index is disabled on the first database error.
+        """
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                yield None
+                return
+            try:
+                with db:
+                    yield db
+            except sqlite3.Error as exc:
+                self._disable(exc)
+
+    def save(
+        self,
+        server: str,
+        kind: str,
+        query: str,
+        reviews: list[Review],
+        fetched: list[Review] | None = None,
+    ) -> None:
+        """Store results of a query for reviews of a kind, advancing its mark to
+        newest update fetched.
+        """
+        with spans.span("index", server=server, items=len(reviews)):
+            mark = self.mark(server, query)
+            for review in reviews if fetched is None else fetched:
+                if not mark or review.updated > mark:
+                    mark = review.updated
+            rows = [
+                (
+                    server,
+                    review.url,
+                    kind,
+                    str(review.number),
+                    review.project,
+                    review.branch,
+                    review.topic,
+                    review.owner,
+                    json.dumps({k: v.value for k, v in review.labels.items()}),
+                    review.score,
+                    review.updated.strftime(TIME_FORMAT),
+                    review.status,
+                    json.dumps(review.data),
+                )
+                for review in reviews
+            ]
+            with self._connection() as db:
+                if db is None:
+                    return
+                db.executemany(
+                    "INSERT OR REPLACE INTO reviews VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                    rows,
+                )
+                db.execute(
+                    "DELETE FROM results WHERE server = ? AND query = ?",
+                    (server, query),
+                )
+                db.executemany(
+                    "INSERT OR IGNORE INTO results VALUES (?,?,?)",
+                    [(server, query, row[1]) for row in rows],
+                )
+                db.execute(
+                    "INSERT OR REPLACE INTO queries VALUES (?,?,?)",
+                    (server, query, mark.strftime(TIME_FORMAT) if mark else None),
+                )
+            LOG.debug("Indexed %s reviews from %s for %s", len(rows), server, query)
+
+    def accounts(self, server: str) -> dict[str, str]:
+        """Return account ids of users, as previously resolved by server."""
+        return dict(
+            self._select(
+                "SELECT user, account FROM accounts WHERE server = ?",
+                [server],
+            ),
+        )
+
+    def save_accounts(self, server: str, accounts: dict[str, str]) -> None:
+        """Remember account ids of users, so they are resolved only once."""
+        with self._connection() as db:
+            if db is not None:
+                db.executemany(
+                    "INSERT OR REPLACE INTO accounts VALUES (?,?,?)",
+                    [(server, user, account) for user, account in accounts.items()],
+                )
+
+    def load(
+        self,
+        server: str,
+        query: str,
+        since: datetime.datetime | None = None,
+        until: datetime.datetime | None = None,
+    ) -> list[dict]:
+        """Return data of reviews last returned by a query, in update range."""
+        sql = (
+            "SELECT reviews.data FROM results JOIN reviews"
+            " ON reviews.server = results.server AND reviews.url = results.url"
+            " WHERE results.server = ? AND results.query = ?"
+        )
+        params: list[str] = [server, query]
+        if since:
+            sql += " AND reviews.updated >= ?"
+            params.append(since.strftime(TIME_FORMAT))
+        if until:
+            sql += " AND reviews.updated <= ?"
+            params.append(until.strftime(TIME_FORMAT))
+        return [json.loads(row[0]) for row in self._select(sql, params)]
+
+    def find(
+        self,
+        server: str,
+        kind: str,
+        status: str,
+        owners: list[str],
+        since: datetime.datetime | None = None,
+        until: datetime.datetime | None = None,
+    ) -> list[dict]:
+        """Return data of reviews of a kind with a status and one of the owners,
+        in update range, whichever queries returned them.
+        """
+        # only placeholders are formatted into the statement
+        placeholders = ",".join("?" * len(owners))
+        sql = "SELECT data FROM reviews WHERE server = ? AND kind = ? AND status = ?"
+        sql += f" AND owner IN ({placeholders})"
+        params: list[str] = [server, kind, status, *owners]
+        if since:
+            sql += " AND updated >= ?"
+            params.append(since.strftime(TIME_FORMAT))
+        if until:
+            sql += " AND updated <= ?"
+            params.append(until.strftime(TIME_FORMAT))
+        return [json.loads(row[0]) for row in self._select(sql, params)]
+
+    def is_saved(self, server: str, query: str) -> bool:
+        """Tell if results of a query were ever saved."""
+        return bool(
+            self._select(
+                "SELECT 1 FROM queries WHERE server = ? AND query = ?",
+                [server, query],
+            ),
+        )
+
+    def mark(self, server: str, query: str) -> datetime.datetime | None:
+        """Return newest update time seen for a query, if it was ever saved."""
+        rows = self._select(
+            "SELECT mark FROM queries WHERE server = ? AND query = ?",
+            [server, query],
+        )
+        if not rows or not rows[0][0]:
+            return None
+        return datetime.datetime.strptime(rows[0][0], TIME_FORMAT)
+
+    def _select(self, sql: str, params: list[str]) -> list[tuple]:
+        """Return rows of a query, none when index is unusable."""
+        with self._connection() as db:
+            if db is not None:
+                return db.execute(sql, params).fetchall()
+        return []
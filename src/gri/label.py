@@ -1,43 +1,52 @@
 import logging
 import re
+from functools import cache
 
 LOG = logging.getLogger(__package__)
 
+ABBR_RE = re.compile("[^A-Z]")
+# Fields of label data contributing to its value, with their contribution
+VALUE_FIELDS = (
+    ("blocking", -2),
+    ("approved", 2),
+    ("recommended", 1),
+    ("disliked", -1),
+    ("rejected", -1),
+)
+KNOWN_FIELDS = frozenset({"value", "optional"}).union(f for f, _ in VALUE_FIELDS)
+META_LABELS = frozenset({"Code-Review", "Workflow", "Verified"})
+
+
+@cache
+def abbreviation(name: str) -> str:
+    """Return label name abbreviated to its capitals, like CR for Code-Review."""
+    return ABBR_RE.sub("", name)
+
 
 # pylint: disable=too-few-public-methods
 class Label:
+    __slots__ = ("name", "abbr", "value")
+
     def __init__(self, name, data) -> None:
         self.name = name
-        self.abbr = re.sub("[^A-Z]", "", name)
+        self.abbr = abbreviation(name)
         self.value = 0
 
-        if data.get("blocking", False):
-            self.value += -2
-        if data.get("approved", False):
-            self.value += 2
-        if data.get("recommended", False):
-            self.value += 1
-        if data.get("disliked", False):
-            self.value += -1
-        if data.get("rejected", False):
-            self.value += -1
+        for field, value in VALUE_FIELDS:
+            if data.get(field, False):
+                self.value += value
         if data.get("optional", False):
             self.value = 1
-        for unknown in set(data.keys()) - {
-            "blocking",
-            "approved",
-            "recommended",
-            "disliked",
-            "rejected",
-            "value",
-            "optional",
-        }:
-            LOG.debug("Found unknown label field %s: %s", unknown, data.get(unknown))
+        if LOG.isEnabledFor(logging.DEBUG):
+            for unknown in data.keys() - KNOWN_FIELDS:
+                LOG.debug(
+                    "Found unknown label field %s: %s",
+                    unknown,
+                    data.get(unknown),
+                )
 
     def is_meta(self) -> bool:
-        if self.name in ["Code-Review", "Workflow", "Verified"]:
-            return True
-        return False
+        return self.name in META_LABELS
 
     def __repr__(self) -> str:
         msg = self.abbr + ":" + str(self.value)
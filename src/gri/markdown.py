@@ -0,0 +1,17 @@
+import rich
+from rich.console import ConsoleOptions, RenderResult
+from rich.markdown import CodeBlock
+from rich.syntax import Syntax
+
+
+# pylint: disable=too-few-public-methods
+class MyCodeBlock(CodeBlock):
+    # pylint: disable=unused-argument
+    def __rich_console__(
+        self,
+        console: rich.console.Console,
+        options: ConsoleOptions,
+    ) -> RenderResult:
+        code = str(self.text).rstrip()
+        syntax = Syntax(code, self.lexer_name, theme=self.theme)
+        yield syntax
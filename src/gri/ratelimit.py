@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from requests.auth import AuthBase
+
+from gri import spans
+
+if TYPE_CHECKING:
+    import requests
+
+LOG = logging.getLogger(__package__)
+
+# Requests allowed per second and burst size for each token, matching the
+# primary rate limits of authenticated requests to each GitHub api resource
+RATES = {
+    "search": (30 / 60, 30),
+    "graphql": (5000 / 3600, 100),
+    "core": (5000 / 3600, 100),
+}
+# Limits applying to anonymous requests, which use the ip address quota
+ANONYMOUS_RATES = {
+    "search": (10 / 60, 10),
+    "graphql": (0, 0),
+    "core": (60 / 3600, 60),
+}
+# Requests rejected because of a rate limit are sent again, at most this times
+MAX_RETRIES = 3
+# Wait recommended by GitHub when a secondary limit does not say how long
+SECONDARY_LIMIT_WAIT = 60.0
+# Waits longer than that are reported
+REPORTED_WAIT = 5.0
+
+
+@dataclass
+class Quota:
+    """Usage of one token for one api resource."""
+
+    token: str | None
+    rate: float
+    burst: float
+    # token bucket level, refilled at rate per second up to burst
+    level: float = 0.0
+    refilled: float = field(default_factory=time.monotonic)
+    # known from the X-RateLimit headers of the last response
+    remaining: int | None = None
+    reset: float = 0.0
+    # set by Retry-After and secondary limits
+    blocked_until: float = 0.0
+
+    def __post_init__(self) -> None:
+        self.level = self.burst
+
+    def wait(self, now: float) -> float:
+        """Return seconds before a request can use this quota, refilling it."""
+        self.level = min(self.burst, self.level + (now - self.refilled) * self.rate)
+        self.refilled = now
+        wait = max(0.0, self.blocked_until - time.time())
+        if self.remaining == 0:
+            wait = max(wait, self.reset - time.time())
+        if self.level < 1:
+            if not self.rate:
+                return float("inf")
+            wait = max(wait, (1 - self.level) / self.rate)
+        return wait
+
+
+class RateLimiter:
+    """Schedules requests over a pool of tokens, within their rate limits.
+
+    Each request uses the token with most quota left for the api resource it
+    targets, waiting when none has any. Quotas are throttled with a token
+    bucket, and updated from rate limit headers of responses.
+    """
+
+    def __init__(self, tokens: list[str]) -> None:
+        self._lock = threading.Lock()
+        pool: list[str | None] = list(tokens) or [None]
+        rates = RATES if tokens else ANONYMOUS_RATES
+        self._quotas = {
+            resource: [Quota(t, rate, burst) for t in pool]
+            for resource, (rate, burst) in rates.items()
+        }
+
+    def acquire(self, resource: str) -> str | None:
+        """Wait until a request to resource can be made, returning its token."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                quota = min(
+                    self._quotas[resource],
+                    key=lambda q: (q.wait(now), -q.level),
+                )
+                wait = quota.wait(now)
+                if not wait:
+                    quota.level -= 1
+                    if quota.remaining:
+                        quota.remaining -= 1
+                    return quota.token
+            if wait == float("inf"):
+                msg = f"GitHub {resource} api cannot be used without a token"
+                raise RuntimeError(msg)
+            if wait > REPORTED_WAIT:
+                LOG.warning(
+                    "GitHub %s rate limit reached, waiting %.0fs",
+                    resource,
+                    wait,
+                )
+            time.sleep(wait)
+            spans.record("throttle", wait, resource=resource)
+
+    def update(
+        self,
+        token: str | None,
+        resource: str,
+        response: requests.Response,
+    ) -> bool:
+        """Record rate limit state from a response, telling if it was rejected
+        because of a rate limit, in which case it can be retried.
+        """
+        headers = response.headers
+        resource = headers.get("X-RateLimit-Resource", resource)
+        with self._lock:
+            quota = next(
+                (q for q in self._quotas.get(resource, []) if q.token == token),
+                None,
+            )
+            if quota is None:
+                return False
+            if "X-RateLimit-Remaining" in headers:
+                quota.remaining = int(headers["X-RateLimit-Remaining"])
+                quota.reset = float(headers.get("X-RateLimit-Reset", 0))
+            if response.status_code not in (403, 429):
+                return False
+            if "Retry-After" in headers:
+                quota.blocked_until = time.time() + float(headers["Retry-After"])
+                return True
+            if quota.remaining == 0:
+                return True
+            if "secondary rate limit" in response.text.lower():
+                quota.blocked_until = time.time() + SECONDARY_LIMIT_WAIT
+                return True
+        return False
+
+
+class RateLimitedAuth(AuthBase):
+    """Authenticates requests with tokens from a rate limiter, resending
+    those rejected because of a rate limit.
+    """
+
+    def __init__(self, limiter: RateLimiter) -> None:
+        self.limiter = limiter
+
+    def __call__(self, request: requests.PreparedRequest) -> requests.PreparedRequest:
+        self.authorize(request)
+        request.register_hook("response", self.handle)
+        return request
+
+    def authorize(self, request: requests.PreparedRequest) -> None:
+        token = self.limiter.acquire(resource(request.path_url))
+        request.headers.pop("Authorization", None)
+        if token:
+            request.headers["Authorization"] = f"token {token}"
+
+    def handle(self, response: requests.Response, **kwargs) -> requests.Response:
+        history: list[requests.Response] = []
+        while len(history) < MAX_RETRIES and self.limiter.update(
+            token(response.request),
+            resource(response.request.path_url),
+            response,
+        ):
+            LOG.debug("Rate limited, retrying %s", response.request.url)
+            # release the connection before sending the request again
+            response.close()
+            history.append(response)
+            request = response.request.copy()
+            self.authorize(request)
+            response = response.connection.send(request, **kwargs)
+            response.request = request
+        response.history[:0] = history
+        return response
+
+
+def resource(path: str) -> str:
+    """Return the GitHub api resource whose rate limit applies to path."""
+    # enterprise servers serve the api under a prefix, like /api/v3
+    if "/search/" in path:
+        return "search"
+    if path.endswith("/graphql"):
+        return "graphql"
+    return "core"
+
+
+def token(request: requests.PreparedRequest) -> str | None:
+    """Return the token used by a request, if any."""
+    value = request.headers.get("Authorization", "")
+    return value[6:] if value.startswith("token ") else None
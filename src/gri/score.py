@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from gri import spans
+
+if TYPE_CHECKING:
+    import datetime
+    from collections.abc import Mapping, Sequence
+
+    from gri.abc import Review
+
+# Weights used unless overridden by the score key of the config file. Labels
+# are keyed by their abbreviation and map to the factors applied to reviews
+# having no vote on them and to those having a negative one.
+DEFAULT_WEIGHTS: dict = {
+    "labels": {
+        "V": [0.8, 0.6],
+        "W": [0.95, 0.5],
+        "CR": [0.8, 0.3],
+    },
+    "age": 7,
+    "max-age": 365,
+    "wip": 0.05,
+}
+
+
+class ScoreRank:
+    """Secret ScoreRank implementation which aims to map any review on a
+    scale from 0 to 1, where 1 is already merged, and 0 is something that will
+    never merge.
+
+    We start from perfect and downgrade rating using multiplication as this
+    assures we stick between [0,1]. Reviews are scored in batches, one column
+    of values at a time, so the same weights apply to reviews of all servers.
+    """
+
+    def __init__(self, cfg: dict | None = None) -> None:
+        cfg = cfg or {}
+        labels = {**DEFAULT_WEIGHTS["labels"], **cfg.get("labels", {})}
+        self.labels = {
+            abbr: (float(unset), float(negative))
+            for abbr, (unset, negative) in labels.items()
+        }
+        self.age = int(cfg.get("age", DEFAULT_WEIGHTS["age"]))
+        self.max_age = int(cfg.get("max-age", DEFAULT_WEIGHTS["max-age"]))
+        self.wip = float(cfg.get("wip", DEFAULT_WEIGHTS["wip"]))
+
+    def rank(self, reviews: Sequence[Review], now: datetime.datetime) -> None:
+        """Update score of each of the reviews, as of now."""
+        with spans.span("score", items=len(reviews)):
+            columns: dict[str, list[int | None]] = {abbr: [] for abbr in self.labels}
+            for review in reviews:
+                values = {label.abbr: label.value for label in review.labels.values()}
+                for abbr, column in columns.items():
+                    column.append(values.get(abbr))
+            scores = self.scores(
+                columns,
+                [review.age(now) for review in reviews],
+                [review.is_wip for review in reviews],
+            )
+            for review, score in zip(reviews, scores):
+                review.score = score
+
+    def scores(
+        self,
+        labels: Mapping[str, Sequence[int | None]],
+        ages: Sequence[int],
+        wip: Sequence[bool],
+    ) -> list[float]:
+        """Return scores from label values (None when unset), ages and WIP flags.
+
+        All sequences hold one item per review, in the same order.
+        """
+        # starring is ignored as it does not effectively affect chance of merging
+        scores = [1.0] * len(ages)
+        for abbr, column in labels.items():
+            unset, negative = self.labels[abbr]
+            scores = [
+                score * (unset if value == 0 else negative)
+                if value is not None and value < 1
+                else score
+                for score, value in zip(scores, column)
+            ]
+
+        # penalty for reviews over age days old
+        max_age = self.max_age
+        scores = [
+            score * (1 - min(max_age, age) / max_age) if age > self.age else score
+            for score, age in zip(scores, ages)
+        ]
+
+        # We just want to keep wip changes in the same are ~0..1 score.
+        return [
+            score * self.wip if is_wip else score for score, is_wip in zip(scores, wip)
+        ]
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Functions receiving each finished span, from whatever thread finished it.
+# Spans are only measured while there is at least one of them.
+HOOKS: list[Callable[[Span], None]] = []
+# Spans kept for the summary printed by --profile
+SPANS: list[Span] = []
+# Attributes summed by summary(), along with span durations
+SUMMED = ("items", "bytes")
+ORIGIN = time.perf_counter()
+
+
+@dataclass
+class Span:
+    """Time spent in a phase of a run, like a request or rendering a report.
+
+    Attributes tell what it was spent on, like server, query, items or bytes.
+    """
+
+    name: str
+    # seconds since gri started
+    start: float
+    duration: float
+    attributes: dict[str, Any] = field(default_factory=dict)
+    thread: str = field(default_factory=lambda: threading.current_thread().name)
+
+
+def add_hook(hook: Callable[[Span], None]) -> None:
+    """Call hook with each span finished from now on, to forward them."""
+    HOOKS.append(hook)
+
+
+def enable() -> None:
+    """Keep finished spans, so their summary can be printed."""
+    if SPANS.append not in HOOKS:
+        add_hook(SPANS.append)
+
+
+def enabled() -> bool:
+    return bool(HOOKS)
+
+
+def record(name: str, duration: float, **attributes: Any) -> None:
+    """Record a span which just ended, after lasting duration seconds."""
+    if not HOOKS:
+        return
+    start = time.perf_counter() - ORIGIN - duration
+    finished = Span(name, start, duration, attributes)
+    for hook in HOOKS:
+        hook(finished)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[dict[str, Any]]:
+    """Measure the enclosed code, yielding attributes so they can be added to."""
+    if not HOOKS:
+        yield attributes
+        return
+    start = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        record(name, time.perf_counter() - start, **attributes)
+
+
+def timed(
+    build: Callable[[T], R],
+    items: Iterable[T],
+    name: str = "build",
+    **attributes: Any,
+) -> Iterator[R]:
+    """Yield build(item) for each item, recording time spent in build alone,
+    not the one spent producing items or consuming results.
+    """
+    if not HOOKS:
+        yield from map(build, items)
+        return
+    spent = 0.0
+    count = 0
+    try:
+        for item in items:
+            start = time.perf_counter()
+            result = build(item)
+            spent += time.perf_counter() - start
+            count += 1
+            yield result
+    finally:
+        record(name, spent, items=count, **attributes)
+
+
+def summary() -> list[dict[str, Any]]:
+    """Return totals of kept spans for each phase and server, in order of
+    first occurrence.
+    """
+    totals: dict[tuple[str, str], dict[str, Any]] = {}
+    for item in sorted(SPANS, key=lambda s: s.start):
+        server = item.attributes.get("server", "")
+        total = totals.setdefault(
+            (item.name, server),
+            {"name": item.name, "server": server, "calls": 0, "total": 0.0, "max": 0.0}
+            | dict.fromkeys(SUMMED, 0),
+        )
+        total["calls"] += 1
+        total["total"] += item.duration
+        total["max"] = max(total["max"], item.duration)
+        for key in SUMMED:
+            total[key] += item.attributes.get(key, 0)
+    return list(totals.values())
+
+
+def dump(path: str) -> None:
+    """Save kept spans, along with their summary, as JSON."""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(
+            {"spans": [asdict(s) for s in SPANS], "summary": summary()},
+            file,
+            indent=2,
+            default=str,
+        )
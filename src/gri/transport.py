@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
+
+LOG = logging.getLogger(__package__)
+
+# Connections kept open to each host, enough for servers sharing a host and
+# for the pages some of them retrieve in parallel
+POOL_SIZE = 16
+# Number of hosts whose connections are kept open
+POOL_HOSTS = 32
+# Seconds allowed to establish a connection, unless connect-timeout is set
+CONNECT_TIMEOUT = 10.0
+# Transient errors are retried at once, then after 1s, 2s..., each of these
+# delays being extended by up to BACKOFF_JITTER seconds
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+BACKOFF_JITTER = 0.5
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+# Compressions supported by the installed urllib3, brotli when available
+ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]
+
+# Adapters shared by all sessions, by whether they retry POST requests
+_adapters: dict[bool, HTTPAdapter] = {}
+_lock = threading.Lock()
+
+
+class JitterRetry(Retry):
+    """Retry whose delays are randomized, so clients do not retry in sync."""
+
+    def get_backoff_time(self) -> float:
+        jitter = random.uniform(0, BACKOFF_JITTER)  # noqa: S311
+        return super().get_backoff_time() + jitter
+
+
+def adapter(*, retry_post: bool = False) -> HTTPAdapter:
+    """Return an adapter shared by all sessions, holding their connections.
+
+    Only idempotent requests are retried, unless retry_post tells that POST
+    requests sent using the adapter are too, like GraphQL queries are.
+    """
+    with _lock:
+        if retry_post not in _adapters:
+            methods = Retry.DEFAULT_ALLOWED_METHODS
+            if retry_post:
+                methods |= {"POST"}
+            _adapters[retry_post] = HTTPAdapter(
+                pool_connections=POOL_HOSTS,
+                pool_maxsize=POOL_SIZE,
+                max_retries=JitterRetry(
+                    total=RETRIES,
+                    backoff_factor=BACKOFF_FACTOR,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=methods,
+                    # let callers handle errors still present after retries
+                    raise_on_status=False,
+                ),
+            )
+        return _adapters[retry_post]
+
+
+def session() -> requests.Session:
+    """Return a new session using the shared connection pools.
+
+    Each server uses its own session, holding its credentials and headers,
+    while connections to the same host are reused by all of them.
+    """
+    result = requests.Session()
+    result.mount("https://", adapter())
+    result.mount("http://", adapter())
+    result.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    return result
+
+
+def timeouts(cfg: dict, default: float | None) -> tuple[float, float | None]:
+    """Return connect and read timeouts of a server, from its config entry.
+
+    The timeout key defines the read timeout, defaulting to --timeout, while
+    connections failing to be established are given up on sooner.
+    """
+    read = cfg.get("timeout", default)
+    connect = CONNECT_TIMEOUT if read is None else min(CONNECT_TIMEOUT, read)
+    return float(cfg.get("connect-timeout", connect)), read
@@ -0,0 +1,18 @@
+"""Time budgets of benchmarks, only enforced on machines they were set for."""
+from __future__ import annotations
+
+import os
+
+# Makes times exceeding their budget an error, instead of only reporting them
+STRICT_ENV = "GRI_BENCH_STRICT"
+
+
+def exit_code(*, exceeded: bool) -> int:
+    """Return exit code of a benchmark, telling if it exceeded its budget.
+
+    Budgets depend on the machine, so they are only enforced on demand.
+    """
+    if exceeded and not os.environ.get(STRICT_ENV):
+        print(f"Not failing, as {STRICT_ENV} is not set")
+        return 0
+    return 1 if exceeded else 0
@@ -0,0 +1,109 @@
+"""Micro-benchmark of building, scoring and rendering reviews from raw data.
+
+Usage: python test/bench/construction.py [--count 50000] [--max-usec N]
+
+When --max-usec is given, reports if building, scoring and rendering a
+single review takes longer than that on average, which is an error when
+GRI_BENCH_STRICT is set, so regressions are caught on known machines.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import sys
+import time
+from types import SimpleNamespace
+
+from budget import exit_code
+from gri.abc import utcnow
+from gri.gerrit import ChangeRequest
+from gri.github import PullRequest
+from gri.score import ScoreRank
+
+LABELS = {
+    "Code-Review": {"approved": {"_account_id": 1}, "value": 2},
+    "Verified": {"rejected": {"_account_id": 2}, "value": -1},
+    "Workflow": {},
+    "Backport-Candidate": {"optional": True},
+}
+
+
+def gerrit_change(number: int, now: datetime.datetime) -> dict:
+    updated = now - datetime.timedelta(hours=number % 5000)
+    return {
+        "_number": number,
+        "project": f"org/project{number % 50}",
+        "branch": "master" if number % 3 else "stable",
+        "topic": f"topic{number % 7}" if number % 2 else "",
+        "subject": f"{'WIP: ' if number % 10 == 0 else ''}Change {number}",
+        "status": "NEW",
+        "mergeable": bool(number % 4),
+        "owner": {"_account_id": number % 100},
+        "updated": f"{updated:%Y-%m-%d %H:%M:%S.%f}000",
+        "labels": LABELS,
+    }
+
+
+def github_pull(number: int, now: datetime.datetime) -> dict:
+    updated = now - datetime.timedelta(hours=number % 5000)
+    return {
+        "number": number,
+        "title": f"Pull {number}",
+        "html_url": f"https://github.com/org/project{number % 50}/pull/{number}",
+        "state": "open",
+        "draft": number % 10 == 0,
+        "user": {"login": f"user{number % 100}"},
+        "updated_at": f"{updated:%Y-%m-%dT%H:%M:%S}Z",
+        "labels": [{"name": "needs-rebase"}],
+        "review_decision": "APPROVED",
+        "ci_status": "FAILURE",
+    }
+
+
+def measure(name: str, build, items: list[dict]) -> float:
+    now = utcnow()
+    start = time.perf_counter()
+    reviews = [build(data) for data in items]
+    built = time.perf_counter()
+    ScoreRank().rank(reviews, now)
+    scored = time.perf_counter()
+    for review in reviews:
+        review.as_columns(now)
+    done = time.perf_counter()
+    usec = (done - start) / len(items) * 1e6
+    print(
+        f"{name:8} {len(items)} reviews: built in {built - start:.3f}s, "
+        f"scored in {scored - built:.3f}s, rendered in {done - scored:.3f}s "
+        f"({usec:.1f}us per review)",
+    )
+    return usec
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--max-usec", type=float, default=0)
+    args = parser.parse_args()
+
+    now = datetime.datetime.now()
+    server = SimpleNamespace(url="https://review.example.com/")
+    worst = max(
+        measure(
+            "gerrit",
+            lambda data: ChangeRequest(data=data, server=server),
+            [gerrit_change(i, now) for i in range(args.count)],
+        ),
+        measure(
+            "github",
+            lambda data: PullRequest(data=data, server=server),
+            [github_pull(i, now) for i in range(args.count)],
+        ),
+    )
+    exceeded = bool(args.max_usec) and worst > args.max_usec
+    if exceeded:
+        print(f"Too slow: {worst:.1f}us per review exceeds {args.max_usec}us")
+    return exit_code(exceeded=exceeded)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""End-to-end benchmark of gri against local Gerrit and GitHub stand-ins.
+
+Usage: python test/bench/e2e.py [--sizes 100,10000,100000] [--runs 1]
+                                [--max-ratio 1.5] [--update]
+
+For each size, starts test/bench/fakeserver.py serving that many changes and
+pull requests, then times `gri owned` retrieving, building, scoring and
+rendering all of them, from loading its config to printing the last row.
+
+Times are measured in units of a calibration workload, run along with them,
+so that they can be compared across machines. The best time of --runs is compared
+with the one stored in e2e-baseline.json, being reported when it is more than
+--max-ratio times slower, which is only an error when GRI_BENCH_STRICT is
+set. --update stores the measured times as the new baseline instead.
+Rendering tables of 100000 rows takes minutes, so tox only runs the smallest
+size.
+
+The stand-ins do not enforce GitHub rate limits, so gri is run without them,
+as waiting for them would be all that gets measured.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from budget import exit_code
+from fakeserver import gerrit_changes
+
+HERE = Path(__file__).parent
+BASELINE = HERE / "e2e-baseline.json"
+TOKEN_ENV = "GRI_BENCH_TOKEN"  # noqa: S105
+# Changes serialized and parsed back by the calibration workload
+CALIBRATION_COUNT = 5000
+CONFIG = """\
+servers:
+  - name: gerrit
+    url: http://127.0.0.1:{gerrit}/
+    max-results: {count}
+  - name: github
+    url: https://github.com/
+    api-url: http://127.0.0.1:{github}
+    token-env: {token_env}
+    max-results: {count}
+"""
+
+
+def run_gri(args: list[str]) -> None:
+    """Run gri in this process, without GitHub rate limits."""
+    # pylint: disable=import-outside-toplevel
+    from gri import ratelimit
+    from gri.__main__ import cli
+
+    ratelimit.RATES = dict.fromkeys(ratelimit.RATES, (1e6, 1e6))
+    cli.main(args, prog_name="gri")
+
+
+def calibrate(runs: int = 20) -> float:
+    """Return best time of a workload resembling what gri does with results,
+    serializing and parsing changes, to measure speed of this machine.
+    """
+    changes = gerrit_changes(CALIBRATION_COUNT, datetime.datetime(2024, 1, 1))
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        json.loads(json.dumps(changes))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(count: int, runs: int) -> float:
+    """Return best time of gri listing count reviews from each server."""
+    with tempfile.TemporaryDirectory() as home:
+        servers = subprocess.Popen(
+            [sys.executable, HERE / "fakeserver.py", "--count", str(count)],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            # printed once servers are ready
+            ports = json.loads(servers.stdout.readline())  # type: ignore[union-attr]
+            config = Path(home, "gri.yaml")
+            config.write_text(
+                CONFIG.format(count=count, token_env=TOKEN_ENV, **ports),
+            )
+            netrc = Path(home, ".netrc")
+            netrc.write_text(
+                f"machine 127.0.0.1:{ports['gerrit']} login bench password bench\n",
+            )
+            netrc.chmod(0o600)
+            env = {
+                **os.environ,
+                "HOME": home,
+                "XDG_CACHE_HOME": home,
+                TOKEN_ENV: "bench",
+                "COLUMNS": "160",
+            }
+            cmd = [sys.executable, __file__, "gri", "--config", str(config)]
+            cmd += ["--no-cache", "owned"]
+            best = float("inf")
+            for _ in range(runs):
+                start = time.perf_counter()
+                subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, check=True)
+                best = min(best, time.perf_counter() - start)
+        finally:
+            servers.terminate()
+            servers.wait()
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,10000,100000")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--max-ratio", type=float, default=1.5)
+    parser.add_argument("--update", action="store_true")
+    args = parser.parse_args()
+
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    unit = calibrate()
+    failed = False
+    for size in args.sizes.split(","):
+        best = measure(int(size), args.runs)
+        # calibrating again tells apart a slow machine from a busy one
+        unit = min(unit, calibrate())
+        units = best / unit
+        expected = baseline.get(size)
+        msg = f"{int(size):>7} reviews per server: {best:.2f}s, {units:.0f} units"
+        if expected:
+            msg += f" ({units / expected:.2f}x baseline of {expected:.0f})"
+            if not args.update and units > expected * args.max_ratio:
+                msg += f", more than {args.max_ratio}x slower"
+                failed = True
+        print(msg, flush=True)
+        baseline[size] = round(units, 1)
+
+    print(f"calibration: {unit * 1000:.1f}ms per unit")
+    if args.update:
+        BASELINE.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"Baseline saved to {BASELINE}")
+        return 0
+    return exit_code(exceeded=failed)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["gri"]:
+        run_gri(sys.argv[2:])
+    else:
+        sys.exit(main())
@@ -0,0 +1,255 @@
+"""Local stand-ins for Gerrit and GitHub servers, serving synthetic reviews.
+
+Usage: python test/bench/fakeserver.py [--count 1000] [--gerrit-port 0] [--github-port 0]
+
+Serves --count changes using the Gerrit REST api (/a/changes/, with its XSSI
+prefix and paging) and as many pull requests using the GitHub search api
+(/search/issues, with its 1000 results limit and updated date ranges), along
+with the accounts gri resolves, until interrupted. Ports actually used are
+printed as a JSON object once ready.
+
+Both servers answer any query with all their reviews, as gri only needs them
+to match what it asked for to exercise parsing, scoring and rendering.
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import datetime
+import json
+import re
+import sys
+import threading
+from contextlib import suppress
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ClassVar
+from urllib.parse import parse_qs, urlparse
+
+XSSI_PREFIX = ")]}'\n"
+# Largest page and number of results returned by the GitHub search api
+MAX_PAGE_SIZE = 100
+MAX_SEARCH_RESULTS = 1000
+# Reviews are updated at regular intervals over that period, newest first
+HISTORY = datetime.timedelta(days=3 * 365)
+UPDATED_RE = re.compile(r"updated:(>=|<=)?(\S+?)(?:\.\.(\S+))?(?:\s|$)")
+# Votes found on Gerrit changes, by label
+VOTES = {
+    "Code-Review": [
+        {},
+        {"approved": {"_account_id": 1001}, "value": 2},
+        {"recommended": {"_account_id": 1002}, "value": 1},
+        {"disliked": {"_account_id": 1003}, "value": -1},
+    ],
+    "Verified": [
+        {"approved": {"_account_id": 1004}, "value": 1},
+        {"approved": {"_account_id": 1004}, "value": 1},
+        {"rejected": {"_account_id": 1004}, "value": -1},
+        {},
+    ],
+    "Workflow": [{}, {}, {}, {"approved": {"_account_id": 1001}, "value": 1}],
+}
+
+
+def updated_times(count: int, now: datetime.datetime) -> list[datetime.datetime]:
+    step = HISTORY / max(count, 1)
+    return [(now - step * i).replace(microsecond=0) for i in range(count)]
+
+
+def gerrit_changes(count: int, now: datetime.datetime) -> list[dict]:
+    changes = []
+    for i, updated in enumerate(updated_times(count, now)):
+        number = count - i
+        labels = {name: votes[number % len(votes)] for name, votes in VOTES.items()}
+        if number % 6 == 0:
+            labels["Backport-Candidate"] = {"optional": True}
+        changes.append(
+            {
+                "id": f"org%2Fproject{number % 40}~master~I{number:040x}",
+                "_number": number,
+                "project": f"org/project{number % 40}",
+                "branch": "master" if number % 5 else "stable/2.1",
+                "topic": f"feature-{number % 13}" if number % 3 == 0 else "",
+                "subject": f"{'WIP: ' if number % 17 == 0 else ''}Fix issue {number}",
+                "status": "NEW",
+                "mergeable": number % 9 != 0,
+                "owner": {"_account_id": 1000 + number % 50},
+                "created": f"{updated - datetime.timedelta(days=3)}.000000000",
+                "updated": f"{updated}.000000000",
+                "insertions": number % 300,
+                "deletions": number % 70,
+                "labels": labels,
+            },
+        )
+    return changes
+
+
+def github_pulls(count: int, now: datetime.datetime) -> list[dict]:
+    """Return pull requests sorted by update time, oldest first."""
+    pulls = []
+    for i, updated in enumerate(reversed(updated_times(count, now))):
+        number = i + 1
+        repo = f"org/repo{number % 40}"
+        pulls.append(
+            {
+                "url": f"https://api.github.com/repos/{repo}/issues/{number}",
+                "html_url": f"https://github.com/{repo}/pull/{number}",
+                "number": number,
+                "title": f"Fix issue {number}",
+                "state": "open",
+                "draft": number % 17 == 0,
+                "user": {"login": f"user{number % 50}"},
+                "labels": [{"name": "bug"}] if number % 4 == 0 else [],
+                "comments": number % 11,
+                "created_at": f"{updated - datetime.timedelta(days=3):%Y-%m-%dT%H:%M:%SZ}",
+                "updated_at": f"{updated:%Y-%m-%dT%H:%M:%SZ}",
+                "pull_request": {"merged_at": None},
+            },
+        )
+    return pulls
+
+
+class GerritHandler(BaseHTTPRequestHandler):
+    changes: ClassVar[list[dict]] = []
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path in ("/a/changes/", "/changes/"):
+            size = int(params.get("n", ["500"])[0])
+            start = int(params.get("S", ["0"])[0])
+            results = []
+            for _ in params.get("q", [""]):
+                page = [dict(change) for change in self.changes[start : start + size]]
+                if page and start + size < len(self.changes):
+                    page[-1]["_more_changes"] = True
+                results.append(page)
+            self.reply(results[0] if len(results) == 1 else results)
+        elif url.path.startswith(("/a/changes/", "/changes/")):
+            number = int(url.path.rstrip("/").rpartition("/")[2])
+            self.reply(self.changes[len(self.changes) - number])
+        elif url.path.startswith(("/a/accounts/", "/accounts/")):
+            self.reply({"_account_id": 1000})
+        elif url.path.endswith("/config/server/version"):
+            self.reply("3.8.0")
+        else:
+            self.send_error(404)
+
+    def reply(self, body: object) -> None:
+        data = (XSSI_PREFIX + json.dumps(body)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class GithubHandler(BaseHTTPRequestHandler):
+    pulls: ClassVar[list[dict]] = []
+    # update times of pulls, to find those of a date range by bisection
+    times: ClassVar[list[str]] = []
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802
+        url = urlparse(self.path)
+        if url.path == "/user":
+            self.reply({"login": "user0"})
+            return
+        if url.path != "/search/issues":
+            self.send_error(404)
+            return
+        params = parse_qs(url.query)
+        size = min(int(params.get("per_page", ["30"])[0]), MAX_PAGE_SIZE)
+        page = int(params.get("page", ["1"])[0])
+        low, high = self.updated_range(params.get("q", [""])[0])
+        # newest first, as sorted by GitHub
+        matches = self.pulls[
+            bisect.bisect_left(self.times, low) : bisect.bisect_right(self.times, high)
+        ][::-1]
+        items = matches[:MAX_SEARCH_RESULTS][(page - 1) * size : page * size]
+        self.reply(
+            {
+                "total_count": len(matches),
+                "incomplete_results": False,
+                "items": items,
+            },
+            resource="search",
+        )
+
+    def reply(self, body: object, resource: str = "core") -> None:
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-RateLimit-Resource", resource)
+        self.send_header("X-RateLimit-Remaining", "30")
+        self.end_headers()
+        self.wfile.write(data)
+
+    @staticmethod
+    def updated_range(query: str) -> tuple[str, str]:
+        """Return bounds of the updated filter of a query, as sortable strings."""
+
+        def bound(value: str, time: str) -> str:
+            # dates alone include the whole day
+            return value if "T" in value else f"{value}T{time}"
+
+        match = UPDATED_RE.search(query)
+        if not match:
+            return "", "~"
+        operator, first, last = match.groups()
+        if last:
+            return bound(first, "00:00:00"), bound(last, "23:59:59") + "Z"
+        if operator == ">=":
+            return bound(first, "00:00:00"), "~"
+        return "", bound(first, "23:59:59") + "Z"
+
+
+def serve(
+    count: int,
+    gerrit_port: int = 0,
+    github_port: int = 0,
+) -> tuple[ThreadingHTTPServer, ThreadingHTTPServer]:
+    """Start both servers in background threads, returning them."""
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    GerritHandler.changes = gerrit_changes(count, now)
+    GithubHandler.pulls = github_pulls(count, now)
+    GithubHandler.times = [pull["updated_at"] for pull in GithubHandler.pulls]
+    servers = (
+        ThreadingHTTPServer(("127.0.0.1", gerrit_port), GerritHandler),
+        ThreadingHTTPServer(("127.0.0.1", github_port), GithubHandler),
+    )
+    for server in servers:
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return servers
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--gerrit-port", type=int, default=0)
+    parser.add_argument("--github-port", type=int, default=0)
+    args = parser.parse_args()
+
+    gerrit, github = serve(args.count, args.gerrit_port, args.github_port)
+    print(
+        json.dumps(
+            {
+                "gerrit": gerrit.server_address[1],
+                "github": github.server_address[1],
+            },
+        ),
+        flush=True,
+    )
+    with suppress(KeyboardInterrupt):
+        threading.Event().wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Benchmark of gri startup time, as seen by --help and shell completion.
+
+Usage: python test/bench/startup.py [--runs 10] [--max-msec N]
+
+Reports the import time of gri.__main__, measured with python -X importtime,
+along with the slowest modules it imports, and the wall time of the fastest
+`gri --help` run. When --max-msec is given, reports if the latter takes
+longer than that, which is an error when GRI_BENCH_STRICT is set.
+"""
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import time
+
+from budget import exit_code
+
+HELP_CMD = [sys.executable, "-m", "gri", "--help"]
+
+
+def import_times() -> list[tuple[int, str]]:
+    """Return cumulative import time in microseconds of modules imported by gri.
+
+    Modules imported at interpreter startup, like site, are not included.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import gri.__main__"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: list[tuple[int, str]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # modules are listed after those they import, top level ones having
+        # a single space of indentation
+        if name.startswith("  "):
+            times.append((int(cumulative), name.strip()))
+        elif name.strip() == "gri.__main__":
+            times.append((int(cumulative), name.strip()))
+            break
+        else:
+            times.clear()
+    return times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-msec", type=float, default=0)
+    args = parser.parse_args()
+
+    times = import_times()
+    total = next(usec for usec, name in times if name == "gri.__main__")
+    print(f"import gri.__main__: {total / 1000:.1f}ms, slowest imports:")
+    top = sorted(times[:-1], reverse=True)[:10]
+    for usec, name in top:
+        print(f"  {usec / 1000:7.1f}ms {name}")
+
+    best = float("inf")
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run(HELP_CMD, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    print(f"gri --help: {best * 1000:.1f}ms (best of {args.runs})")
+
+    exceeded = bool(args.max_msec) and best * 1000 > args.max_msec
+    if exceeded:
+        print(f"Too slow: gri --help exceeds {args.max_msec}ms")
+    return exit_code(exceeded=exceeded)
+
+
+if __name__ == "__main__":
+    sys.exit(main())